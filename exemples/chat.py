@@ -37,6 +37,9 @@ On utilise les fonctions de callback pour paramétrer comment doit
 réagir le serveur lors d'une connexion, d'une déconnexion ou d'une
 réception d'un message. Consultez le code pour plus d'informations.
 
+Le port d'écoute (4000 par défaut) peut être précisé en argument :
+    python chat.py 4001
+
 """
 
 import os
@@ -53,47 +56,44 @@ fin_ligne = "\r\n"
 def connexion(serveur, client):
     """Que se passe-t-il quand client se connecte ?"""
     print("Connexion du client {0}".format(client))
-    for c in serveur.clients.values():
-        if c is not client:
-            c.envoyer("$$ {0} se connecte au serveur{1}".format( \
-                    client, fin_ligne).encode())
+    serveur.diffuser("$$ {0} se connecte au serveur{1}".format( \
+            client, fin_ligne), exclure=client)
 
 def deconnexion(serveur, client):
     """Que se passe-t-il quand client se déconnecte ?"""
     print("Déconnexion du client {0} : {1}".format(client, client.retour))
-    for c in serveur.clients.values():
-        if c is not client:
-            c.envoyer("** {0} se déconnecte du serveur{1}".format( \
-                    client, fin_ligne).encode())
+    serveur.diffuser("** {0} se déconnecte du serveur{1}".format( \
+            client, fin_ligne), exclure=client)
 
 def reception(serveur, client):
     """Que se passe-t-il quand client envoie un message au serveur ?"""
     msg = client.get_message() # msg contient un type bytes, aps str
     print("J'ai réceptionné en bytes {0}".format(msg))
-    for c in serveur.clients.values():
-        c.envoyer("<{0}> {1}{2}".format(client.id, msg, fin_ligne).encode())
+    serveur.diffuser("<{0}> {1}{2}".format(client.id, msg, fin_ligne))
 
 
 # Création et paramétrage du serveur
 
-serveur = ConnexionServeur(4000) # test sur le port 4000
+port = 4000 # test sur le port 4000, sauf si un autre est précisé
+if len(sys.argv) > 1:
+    port = int(sys.argv[1])
+serveur = ConnexionServeur(port)
 
 # Paramétrage des callbacks
 # callback lors de la connexion
 serveur.callbacks["connexion"].fonction = connexion
-serveur.callbacks["connexion"].parametres = (serveur,)
+serveur.callbacks["connexion"].args = (serveur,)
 
 # callback lors de la déconnexion
 serveur.callbacks["deconnexion"].fonction = deconnexion
-serveur.callbacks["deconnexion"].parametres = (serveur,)
+serveur.callbacks["deconnexion"].args = (serveur,)
 
 # callback lors de la réception de message
 serveur.callbacks["reception"].fonction = reception
-serveur.callbacks["reception"].parametres = (serveur,)
+serveur.callbacks["reception"].args = (serveur,)
 
 # Fin du paramétrage du serveur
 
 serveur.init() # initialisation, indispensable
 while True: # le serveur ne s'arrête pas naturellement
-    serveur.verifier_connexions()
-    serveur.verifier_receptions()
+    serveur.verifier() # connexions et réceptions en une seule attente
@@ -0,0 +1,187 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""Ce script compare les files d'attente des actions différées du module
+diffact :
+- le balayage : l'ancienne méthode, qui parcourt toutes les actions à
+  chaque tour
+- le tas (primaires/diffact/file_tas.py)
+- la roue temporelle hiérarchique (primaires/diffact/roue_hierarchique.py)
+
+Pour chaque nombre d'actions, les échéances sont tirées au hasard dans
+les 'horizon' secondes à venir. On mesure le temps d'ajout et de retrait
+d'une action, le temps d'un tour de boucle synchro (le temps avance de
+'resolution' secondes, les actions échues sont retirées de la file mais
+pas exécutées) et le temps de calcul de la prochaine échéance.
+
+Le temps est simulé : le balayage compare directement les échéances au
+temps simulé, sans appeler time.time() pour chaque action comme le
+faisait l'ancienne méthode. Il est donc légèrement avantagé.
+
+Usage :
+    python bench_diffact.py [-n 10000,100000,1000000] [-t tours]
+            [-r resolution] [-o horizon]
+
+"""
+
+import os
+import sys
+import time
+import getopt
+import random
+
+REP_SRC = os.path.dirname(os.path.abspath(__file__)) + "/../src"
+sys.path.append(REP_SRC)
+
+from primaires.diffact.action_differee import ActionDifferee
+from primaires.diffact.file_tas import FileTas
+from primaires.diffact.roue_hierarchique import RoueHierarchique
+
+class FileBalayage:
+    """Ancienne file des actions différées : un dictionnaire parcouru
+    entièrement à chaque tour. Conservée pour comparaison.
+
+    """
+    def __init__(self):
+        self.actions = {}
+
+    def __len__(self):
+        return len(self.actions)
+
+    def ajouter(self, action):
+        self.actions[action.nom] = action
+
+    def annuler(self, action):
+        del self.actions[action.nom]
+
+    def prochaine_echeance(self):
+        if not self.actions:
+            return None
+        return min(action.echeance for action in self.actions.values())
+
+    def extraire(self, maintenant):
+        for nom, action in tuple(self.actions.items()):
+            if action.echeance <= maintenant:
+                del self.actions[nom]
+                yield action
+
+def creer_actions(nb, horizon):
+    """Crée nb actions dont l'échéance tombe dans les horizon secondes.
+    On retourne la liste des actions et la date de leur création.
+
+    """
+    origine = time.time()
+    actions = []
+    for i in range(nb):
+        action = ActionDifferee("action_{0}".format(i), 0, None)
+        action.echeance = origine + random.uniform(0, horizon)
+        actions.append(action)
+    return actions, origine
+
+def mesurer(file, actions, origine, nb_tours, resolution):
+    """Mesure les opérations sur la file et retourne un tuple
+    (ajout en us, retrait en us, tour en ms, prochaine échéance en us,
+    nombre d'actions extraites).
+
+    """
+    for action in actions:
+        action.annulee = False
+
+    debut = time.perf_counter()
+    for action in actions:
+        file.ajouter(action)
+    ajout = (time.perf_counter() - debut) / len(actions) * 1e6
+
+    # On retire une action sur dix
+    retirees = actions[::10]
+    debut = time.perf_counter()
+    for action in retirees:
+        file.annuler(action)
+    retrait = (time.perf_counter() - debut) / len(retirees) * 1e6
+
+    maintenant = origine
+    nb_extraites = 0
+    debut = time.perf_counter()
+    for i in range(nb_tours):
+        maintenant += resolution
+        for action in file.extraire(maintenant):
+            nb_extraites += 1
+    tour = (time.perf_counter() - debut) / nb_tours * 1e3
+
+    debut = time.perf_counter()
+    for i in range(10):
+        file.prochaine_echeance()
+    prochaine = (time.perf_counter() - debut) / 10 * 1e6
+
+    return ajout, retrait, tour, prochaine, nb_extraites
+
+def main():
+    """Point d'entrée du script."""
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "n:t:r:o:")
+    except getopt.GetoptError as err:
+        print(err)
+        sys.exit(1)
+
+    tailles = [10000, 100000, 1000000]
+    nb_tours = 20
+    resolution = 0.1
+    horizon = 60
+    for nom, val in opts:
+        if nom == "-n":
+            tailles = [int(taille) for taille in val.split(",")]
+        elif nom == "-t":
+            nb_tours = int(val)
+        elif nom == "-r":
+            resolution = float(val)
+        elif nom == "-o":
+            horizon = float(val)
+
+    files = (
+        ("balayage", lambda origine: FileBalayage()),
+        ("tas", lambda origine: FileTas()),
+        ("roue", lambda origine: RoueHierarchique(origine, resolution)),
+    )
+
+    print("{0:>8} {1:10} {2:>10} {3:>12} {4:>10} {5:>15} {6:>10}".format(
+            "actions", "file", "ajout (us)", "retrait (us)", "tour (ms)",
+            "prochaine (us)", "extraites"))
+    for taille in tailles:
+        random.seed(taille)
+        actions, origine = creer_actions(taille, horizon)
+        for nom_file, creer_file in files:
+            ajout, retrait, tour, prochaine, nb_extraites = mesurer(
+                    creer_file(origine), actions, origine, nb_tours,
+                    resolution)
+            print("{0:8} {1:10} {2:10.2f} {3:12.2f} {4:10.2f} {5:15.1f} "
+                    "{6:10}".format(taille, nom_file, ajout, retrait, tour,
+                    prochaine, nb_extraites))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce script compare la fonction de nettoyage des messages reçus
+(reseau/fonctions/nettoyage.py) à l'ancienne méthode
+ClientConnecte.nettoyer, sur des lignes de 80 octets et de 64 Ko.
+
+Usage :
+    python bench_nettoyage.py [-r repetitions]
+
+"""
+
+import os
+import sys
+import getopt
+import timeit
+
+REP_SRC = os.path.dirname(os.path.abspath(__file__)) + "/../src"
+sys.path.append(REP_SRC)
+
+from reseau.fonctions.nettoyage import nettoyer
+
+def nettoyer_ancien(message):
+    """Ancienne version de ClientConnecte.nettoyer, conservée pour
+    comparaison.
+
+    """
+    # Compatibilité telnet
+    car_eff = b"\x08"
+    while message.count(car_eff) > 0:
+        pos = message.find(car_eff)
+        if pos > 0:
+            message = message[:pos-1] + message[pos+1:]
+        else:
+            message = message[pos+1:]
+
+    # Compatibilité Tintin++
+    car_eff = 195
+    n_message = b""
+    for i, car in enumerate(message):
+        if not (car == car_eff and i+1<len(message) and \
+                bytes([message[i+1]]).isalpha()):
+            n_message += bytes([car])
+
+    return n_message
+
+def construire_ligne(taille, motif):
+    """Construit une ligne de la taille précisée en répétant le motif."""
+    return (motif * (taille // len(motif) + 1))[:taille]
+
+# Motifs utilisés pour construire les lignes
+MOTIFS = {
+    "simple": b"regarder la fontaine ",
+    "accents": "d\xe9j\xe0 vu ".encode("utf-8") + b"\xc3e ",
+    "effacements": b"dire bonjouu\x08r ",
+}
+
+def main():
+    """Point d'entrée du script."""
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "r:")
+    except getopt.GetoptError as err:
+        print(err)
+        sys.exit(1)
+
+    repetitions = 1000
+    for nom, val in opts:
+        if nom == "-r":
+            repetitions = int(val)
+
+    print("{0:12} {1:>8} {2:>14} {3:>14} {4:>8}".format("motif", "taille",
+            "ancien (us)", "nouveau (us)", "gain"))
+    for taille in (80, 64 * 1024):
+        # Les grandes lignes sont beaucoup plus longues à traiter avec
+        # l'ancienne méthode, on réduit le nombre de répétitions
+        nb = repetitions if taille <= 80 else max(1, repetitions // 1000)
+        for nom_motif, motif in MOTIFS.items():
+            ligne = construire_ligne(taille, motif)
+            assert nettoyer(ligne) == nettoyer_ancien(ligne)
+            ancien = timeit.timeit(lambda: nettoyer_ancien(ligne),
+                    number=nb) / nb * 1e6
+            nouveau = timeit.timeit(lambda: nettoyer(ligne),
+                    number=nb * 10) / (nb * 10) * 1e6
+            print("{0:12} {1:8} {2:14.1f} {3:14.1f} {4:7.0f}x".format(
+                    nom_motif, taille, ancien, nouveau, ancien / nouveau))
+
+if __name__ == "__main__":
+    main()
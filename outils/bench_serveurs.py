@@ -0,0 +1,236 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce script compare les deux serveurs du projet :
+- ConnexionServeur (reseau/connexions/serveur.py), basé sur le sélecteur
+- AsyncConnexionServeur (reseau/connexions/serveur_async.py), basé sur asyncio
+
+Pour chaque serveur, on lance un serveur d'écho dans un processus séparé
+puis on y connecte un certain nombre de clients :
+- inactifs : les clients restent connectés sans rien envoyer, on mesure
+  le temps processeur consommé par le serveur
+- actifs : chaque client envoie régulièrement une ligne et attend son
+  écho, on mesure le débit et la latence
+
+Usage :
+    python bench_serveurs.py [-n 1000,5000] [-d duree] [-i intervalle]
+            [-s select,asyncio] [-p port]
+
+Note: pour plusieurs milliers de clients, la limite du nombre de fichiers
+ouverts (ulimit -n) doit être suffisante.
+
+"""
+
+import os
+import sys
+import time
+import getopt
+import asyncio
+import subprocess
+
+REP_SRC = os.path.dirname(os.path.abspath(__file__)) + "/../src"
+sys.path.append(REP_SRC)
+
+fin_ligne = b"\r\n"
+
+def augmenter_limite_fichiers():
+    """Augmente autant que possible le nombre de fichiers ouverts."""
+    try:
+        import resource
+    except ImportError:
+        return
+    souple, dure = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if souple < dure:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (dure, dure))
+
+def temps_cpu(pid):
+    """Retourne le temps processeur (en secondes) consommé par le
+    processus pid, ou None si on ne peut pas le savoir.
+
+    """
+    try:
+        with open("/proc/{0}/stat".format(pid)) as fichier:
+            champs = fichier.read().rsplit(")", 1)[1].split()
+    except IOError:
+        return None
+    return (int(champs[11]) + int(champs[12])) / os.sysconf("SC_CLK_TCK")
+
+def percentile(valeurs, pourcentage):
+    """Retourne le percentile demandé d'une liste triée."""
+    if not valeurs:
+        return 0
+    return valeurs[min(len(valeurs) - 1, int(len(valeurs) * pourcentage))]
+
+# Côté serveur
+
+def cb_echo(client):
+    """Renvoie au client la ligne qu'il vient d'envoyer."""
+    client.envoyer(client.get_message() + fin_ligne)
+
+def lancer_serveur(nom, port):
+    """Lance le serveur d'écho demandé. Ne retourne pas."""
+    augmenter_limite_fichiers()
+    if nom == "select":
+        from reseau.connexions.serveur import ConnexionServeur
+        serveur = ConnexionServeur(port, nb_clients_attente=1024)
+        serveur.callbacks["reception"].fonction = cb_echo
+        serveur.init()
+        while True:
+            serveur.verifier()
+    else:
+        from reseau.connexions.serveur_async import AsyncConnexionServeur
+        serveur = AsyncConnexionServeur(port, nb_clients_attente=1024)
+        serveur.callbacks["reception"].fonction = cb_echo
+        serveur.lancer(lambda: None, 0.1)
+
+# Côté clients
+
+async def connecter(port, nb):
+    """Connecte nb clients au serveur et retourne leurs flux."""
+    flux = []
+    for i in range(nb):
+        for essai in range(50):
+            try:
+                flux.append(await asyncio.open_connection("127.0.0.1", port))
+            except OSError:
+                await asyncio.sleep(0.05)
+            else:
+                break
+        else:
+            raise RuntimeError("connexion impossible au client {0}".format(i))
+    return flux
+
+async def client_actif(lecteur, ecrivain, fin, intervalle, latences):
+    """Envoie une ligne toutes les intervalle secondes jusqu'à fin et
+    mesure le temps de retour de l'écho.
+
+    """
+    while time.time() < fin:
+        debut = time.perf_counter()
+        ecrivain.write(b"ping " + str(debut).encode() + fin_ligne)
+        await lecteur.readline()
+        latences.append(time.perf_counter() - debut)
+        await asyncio.sleep(intervalle)
+
+async def mesurer(nom, port, nb, actifs, duree, intervalle):
+    """Lance un serveur, y connecte nb clients et retourne les mesures."""
+    processus = subprocess.Popen([sys.executable, os.path.abspath(__file__),
+            "--serveur", nom, "-p", str(port)])
+    try:
+        await asyncio.sleep(0.5)
+        debut = time.perf_counter()
+        flux = await connecter(port, nb)
+        tps_connexion = time.perf_counter() - debut
+        cpu_debut = temps_cpu(processus.pid)
+        latences = []
+        if actifs:
+            fin = time.time() + duree
+            await asyncio.gather(*[client_actif(l, e, fin, intervalle,
+                    latences) for l, e in flux])
+        else:
+            await asyncio.sleep(duree)
+        cpu_fin = temps_cpu(processus.pid)
+        for lecteur, ecrivain in flux:
+            ecrivain.close()
+    finally:
+        processus.terminate()
+        processus.wait()
+
+    latences.sort()
+    cpu = None
+    if cpu_debut is not None and cpu_fin is not None:
+        cpu = (cpu_fin - cpu_debut) / duree * 100
+    return {
+        "serveur": nom,
+        "clients": nb,
+        "mode": "actifs" if actifs else "inactifs",
+        "connexions/s": nb / tps_connexion,
+        "messages/s": len(latences) / duree,
+        "p50 (ms)": percentile(latences, 0.5) * 1000,
+        "p99 (ms)": percentile(latences, 0.99) * 1000,
+        "cpu (%)": cpu,
+    }
+
+def afficher(resultat):
+    """Affiche une ligne de résultat."""
+    cpu = resultat["cpu (%)"]
+    cpu = "?" if cpu is None else "{0:.1f}".format(cpu)
+    print("{serveur:8} {clients:6} {mode:9} {0:10.0f} {1:10.0f} " \
+            "{2:8.2f} {3:8.2f} {4:>6}".format(resultat["connexions/s"],
+            resultat["messages/s"], resultat["p50 (ms)"],
+            resultat["p99 (ms)"], cpu, **resultat))
+
+def main():
+    """Point d'entrée du script."""
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "n:d:i:s:p:",
+                ["serveur="])
+    except getopt.GetoptError as err:
+        print(err)
+        sys.exit(1)
+
+    nombres = [1000, 5000]
+    duree = 5
+    intervalle = 1
+    serveurs = ["select", "asyncio"]
+    port = 4900
+    serveur = None
+    for nom, val in opts:
+        if nom == "-n":
+            nombres = [int(n) for n in val.split(",")]
+        elif nom == "-d":
+            duree = float(val)
+        elif nom == "-i":
+            intervalle = float(val)
+        elif nom == "-s":
+            serveurs = val.split(",")
+        elif nom == "-p":
+            port = int(val)
+        elif nom == "--serveur":
+            serveur = val
+
+    if serveur is not None:
+        lancer_serveur(serveur, port)
+        return
+
+    augmenter_limite_fichiers()
+    print("{0:8} {1:>6} {2:9} {3:>10} {4:>10} {5:>8} {6:>8} {7:>6}".format(
+            "serveur", "nb", "mode", "conn./s", "msg/s", "p50 ms",
+            "p99 ms", "cpu %"))
+    for nb in nombres:
+        for actifs in (False, True):
+            for nom in serveurs:
+                afficher(asyncio.run(mesurer(nom, port, nb, actifs, duree,
+                        intervalle)))
+                port += 1
+
+if __name__ == "__main__":
+    main()
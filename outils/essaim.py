@@ -0,0 +1,355 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+
+"""Ce script est un générateur de charge pour la couche réseau.
+
+Il lance un serveur (la cible) dans un processus séparé, puis y connecte
+un essaim de clients telnet simplifiés. Chaque client envoie
+régulièrement une commande tirée au hasard dans un mélange pondéré et
+attend qu'elle lui soit renvoyée (les serveurs visés renvoient ou
+diffusent chaque ligne reçue). Chaque commande porte un jeton unique
+(#client:numéro) qui permet de mesurer sa latence.
+
+On mesure :
+- le débit d'acceptation des connexions
+- le nombre de messages envoyés et reçus par seconde
+- la latence des échos (p50, p99, p999)
+- le temps processeur consommé par le serveur et par l'essaim
+
+Cibles disponibles :
+- kassie : le MUD (src/kassie.py). Le contrôle du débit des clients est
+  désactivé, sauf si l'option --limites est précisée
+- chat : l'exemple de chat (exemples/chat.py)
+- select, asyncio : les serveurs d'écho de bench_serveurs.py
+- externe : un serveur déjà lancé, sur le port précisé
+
+Attention : kassie et chat diffusent chaque message à tous les clients.
+Le nombre de lignes reçues croît donc comme le carré du nombre de clients
+et l'essaim lui-même peut devenir le facteur limitant (voir son temps
+processeur dans les résultats).
+
+Usage :
+    python essaim.py [-c kassie,chat,select,asyncio,externe] [-n clients]
+            [-d duree] [-i intervalle] [-m melange] [-k simultanes]
+            [-p port] [-o resultats.json] [--limites]
+
+Le mélange est de la forme "commande:poids,commande:poids", par exemple :
+    -m "regarder:5,dire bonjour:2,nord:1"
+
+Les résultats sont affichés et, si l'option -o est précisée, enregistrés
+au format JSON (une liste contenant un résultat par cible) pour comparer
+plusieurs lancements.
+
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import getopt
+import shutil
+import asyncio
+import tempfile
+import subprocess
+
+from bench_serveurs import augmenter_limite_fichiers, temps_cpu, percentile
+
+REP_OUTILS = os.path.dirname(os.path.abspath(__file__))
+REP_SRC = REP_OUTILS + "/../src"
+REP_EXEMPLES = REP_OUTILS + "/../exemples"
+
+fin_ligne = b"\r\n"
+
+# Jeton ajouté à chaque commande envoyée
+RE_JETON = re.compile(rb"#(\d+):(\d+)")
+
+# Configuration du serveur de kassie, sans contrôle du débit des clients
+CONFIG_KASSIE = {
+    "nb_clients_attente": 1024,
+    "lignes_par_seconde": -1,
+    "octets_par_seconde": -1,
+    "taille_max_entree": -1,
+    "connexions_par_ip": -1,
+    "delai_inactivite": -1,
+}
+
+def lancer_cible(cible, port, rep_temp, limites):
+    """Lance le serveur visé et retourne son processus (None si le
+    serveur est externe).
+
+    """
+    sortie = subprocess.DEVNULL
+    if cible == "kassie":
+        rep_config = os.path.join(rep_temp, "config")
+        os.makedirs(rep_config)
+        if not limites:
+            with open(os.path.join(rep_config, "serveur.cfg"), "w") as fichier:
+                for nom, valeur in CONFIG_KASSIE.items():
+                    fichier.write("{0} = {1}\n".format(nom, valeur))
+        return subprocess.Popen([sys.executable, "kassie.py", "-p", str(port),
+                "-c", rep_config, "-l", os.path.join(rep_temp, "logs")],
+                cwd=REP_SRC, stdout=sortie, stderr=sortie)
+    elif cible == "chat":
+        return subprocess.Popen([sys.executable, "chat.py", str(port)],
+                cwd=REP_EXEMPLES, stdout=sortie, stderr=sortie)
+    elif cible in ("select", "asyncio"):
+        return subprocess.Popen([sys.executable,
+                os.path.join(REP_OUTILS, "bench_serveurs.py"),
+                "--serveur", cible, "-p", str(port)],
+                stdout=sortie, stderr=sortie)
+    elif cible == "externe":
+        return None
+    else:
+        raise ValueError("cible inconnue : {0}".format(cible))
+
+async def attendre_serveur(port, delai=10):
+    """Attend que le serveur accepte les connexions."""
+    fin = time.time() + delai
+    while True:
+        try:
+            lecteur, ecrivain = await asyncio.open_connection("127.0.0.1",
+                    port)
+        except OSError:
+            if time.time() > fin:
+                raise RuntimeError("le serveur ne répond pas sur le port " \
+                        "{0}".format(port))
+            await asyncio.sleep(0.1)
+        else:
+            ecrivain.close()
+            return
+
+async def connecter(port, nb, simultanes):
+    """Connecte nb clients, au plus simultanes à la fois.
+    Retourne la liste des flux connectés et le nombre d'échecs.
+
+    """
+    semaphore = asyncio.Semaphore(simultanes)
+    async def connecter_un():
+        async with semaphore:
+            try:
+                return await asyncio.open_connection("127.0.0.1", port,
+                        limit=1 << 20)
+            except OSError:
+                return None
+
+    resultats = await asyncio.gather(*[connecter_un() for i in range(nb)])
+    flux = [r for r in resultats if r is not None]
+    return flux, nb - len(flux)
+
+class Client:
+    """Un client de l'essaim : il envoie ses commandes et reconnaît
+    les siennes parmi les lignes reçues.
+
+    """
+    def __init__(self, numero, lecteur, ecrivain, stats):
+        self.numero = numero
+        self.lecteur = lecteur
+        self.ecrivain = ecrivain
+        self.stats = stats
+        self.en_attente = {} # {numéro de commande:date d'envoi}
+
+    async def lire(self):
+        """Lit les lignes reçues jusqu'à la déconnexion."""
+        stats = self.stats
+        while True:
+            try:
+                ligne = await self.lecteur.readline()
+            except (OSError, ValueError):
+                break
+            if not ligne:
+                break
+            stats["lignes_recues"] += 1
+            jeton = RE_JETON.search(ligne)
+            if jeton and int(jeton.group(1)) == self.numero:
+                envoi = self.en_attente.pop(int(jeton.group(2)), None)
+                if envoi is not None:
+                    stats["latences"].append(time.perf_counter() - envoi)
+
+    async def envoyer(self, fin, intervalle, commandes, poids):
+        """Envoie des commandes jusqu'à la date fin."""
+        # On étale les premiers envois sur un intervalle
+        await asyncio.sleep(random.uniform(0, intervalle))
+        numero = 0
+        while time.time() < fin:
+            numero += 1
+            commande = random.choices(commandes, poids)[0]
+            self.en_attente[numero] = time.perf_counter()
+            self.ecrivain.write("{0} #{1}:{2}".format(commande, self.numero,
+                    numero).encode() + fin_ligne)
+            self.stats["envoyes"] += 1
+            try:
+                await self.ecrivain.drain()
+            except OSError:
+                self.stats["erreurs"] += 1
+                return
+            await asyncio.sleep(intervalle * random.uniform(0.5, 1.5))
+
+async def lancer_essaim(cible, port, nb, duree, intervalle, melange,
+        simultanes, limites):
+    """Lance la cible, y connecte l'essaim et retourne les mesures."""
+    rep_temp = tempfile.mkdtemp(prefix="essaim_")
+    processus = lancer_cible(cible, port, rep_temp, limites)
+    try:
+        await attendre_serveur(port)
+        debut = time.perf_counter()
+        flux, echecs = await connecter(port, nb, simultanes)
+        tps_connexion = time.perf_counter() - debut
+
+        stats = {"envoyes": 0, "lignes_recues": 0, "erreurs": 0,
+                "latences": []}
+        clients = [Client(i, l, e, stats) for i, (l, e) in enumerate(flux)]
+        lectures = [asyncio.ensure_future(c.lire()) for c in clients]
+        commandes = list(melange.keys())
+        poids = list(melange.values())
+
+        cpu_debut = processus and temps_cpu(processus.pid)
+        cpu_essaim = time.process_time()
+        debut = time.perf_counter()
+        fin = time.time() + duree
+        await asyncio.gather(*[c.envoyer(fin, intervalle, commandes, poids)
+                for c in clients])
+        duree_reelle = time.perf_counter() - debut
+        cpu_fin = processus and temps_cpu(processus.pid)
+        cpu_essaim = time.process_time() - cpu_essaim
+
+        # On laisse aux derniers échos le temps d'arriver
+        await asyncio.sleep(min(2, intervalle * 2))
+        for lecture in lectures:
+            lecture.cancel()
+        for lecteur, ecrivain in flux:
+            ecrivain.close()
+    finally:
+        if processus is not None:
+            processus.terminate()
+            processus.wait()
+        shutil.rmtree(rep_temp, ignore_errors=True)
+
+    latences = sorted(stats["latences"])
+    cpu = None
+    if cpu_debut is not None and cpu_fin is not None:
+        cpu = (cpu_fin - cpu_debut) / duree_reelle * 100
+    return {
+        "cible": cible,
+        "clients": nb,
+        "echecs connexion": echecs,
+        "duree (s)": duree_reelle,
+        "intervalle (s)": intervalle,
+        "melange": melange,
+        "connexions/s": len(flux) / tps_connexion,
+        "envoyes/s": stats["envoyes"] / duree_reelle,
+        "echos/s": len(latences) / duree_reelle,
+        "lignes recues/s": stats["lignes_recues"] / duree_reelle,
+        "echos perdus": stats["envoyes"] - len(latences),
+        "erreurs": stats["erreurs"],
+        "p50 (ms)": percentile(latences, 0.5) * 1000,
+        "p99 (ms)": percentile(latences, 0.99) * 1000,
+        "p999 (ms)": percentile(latences, 0.999) * 1000,
+        "cpu serveur (%)": cpu,
+        "cpu essaim (%)": cpu_essaim / duree_reelle * 100,
+    }
+
+def lire_melange(texte):
+    """Lit le mélange de commandes : "commande:poids,commande:poids"."""
+    melange = {}
+    for element in texte.split(","):
+        commande, sep, poids = element.rpartition(":")
+        if not sep:
+            commande, poids = element, "1"
+        melange[commande.strip()] = float(poids)
+    return melange
+
+def afficher(resultat):
+    """Affiche un résultat."""
+    print("Cible {cible} : {clients} clients ({echecs connexion} échecs), " \
+            "{duree (s):.1f} s".format(**resultat))
+    for cle, valeur in resultat.items():
+        if isinstance(valeur, float):
+            print("  {0:18} {1:12.2f}".format(cle, valeur))
+        elif cle not in ("cible", "clients", "melange"):
+            print("  {0:18} {1:>12}".format(cle, str(valeur)))
+
+def main():
+    """Point d'entrée du script."""
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "c:n:d:i:m:k:p:o:",
+                ["limites"])
+    except getopt.GetoptError as err:
+        print(err)
+        sys.exit(1)
+
+    cibles = ["kassie"]
+    nb = 500
+    duree = 10
+    intervalle = 1
+    melange = {"regarder": 5, "dire bonjour": 2, "nord": 1}
+    simultanes = 100
+    port = 4950
+    fichier = None
+    limites = False
+    for nom, val in opts:
+        if nom == "-c":
+            cibles = val.split(",")
+        elif nom == "-n":
+            nb = int(val)
+        elif nom == "-d":
+            duree = float(val)
+        elif nom == "-i":
+            intervalle = float(val)
+        elif nom == "-m":
+            melange = lire_melange(val)
+        elif nom == "-k":
+            simultanes = int(val)
+        elif nom == "-p":
+            port = int(val)
+        elif nom == "-o":
+            fichier = val
+        elif nom == "--limites":
+            limites = True
+
+    augmenter_limite_fichiers()
+    resultats = []
+    for cible in cibles:
+        resultat = asyncio.run(lancer_essaim(cible, port, nb, duree,
+                intervalle, melange, simultanes, limites))
+        afficher(resultat)
+        resultats.append(resultat)
+        if cible != "externe":
+            port += 1
+
+    if fichier is not None:
+        with open(fichier, "w") as sortie:
+            json.dump(resultats, sortie, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -58,7 +58,8 @@ class Module:
     en fonction de la configuration définie et instanciée dans config,
     de "lancer" un module. Si des actions différées doivent être mises en
     place pendant l'appel au module, elles doivent être créées dans cette
-    méthode.
+    méthode. Les modules sont initialisés par ordre_initialisation
+    croissant (0 par défaut).
 
     La méthode detruire doit éviter de se charger de l'enregistrement des
     données. Il est préférable que cette opération se fasse en temps réel,
@@ -70,6 +71,16 @@ class Module:
     -   boucle : appelée à chaque tour de boucle synchro, elle permet
         d'accomplir une certaine action le plus régulièrement possible
 
+    Seuls les modules redéfinissant la méthode boucle sont appelés par
+    l'importeur à chaque tour. Ils peuvent préciser, grâce aux attributs
+    de classe suivants :
+    -   ordre_boucle : leur rang d'appel (les plus petits d'abord, les
+        modules de même rang étant appelés par ordre alphabétique)
+    -   periode_tours : le nombre de tours séparant deux appels (1 pour
+        être appelé à chaque tour)
+    -   periode_secondes : le nombre de secondes séparant au minimum deux
+        appels (0 pour n'imposer aucun délai)
+
     On passe en paramètre du module l'importeur. Cela permet, pour un module,
     d'avoir accès à tous les autres modules chargés. Mais de ce fait,
     il est fortement déconseillé de faire référence à d'autres modules lors
@@ -79,6 +90,11 @@ class Module:
     précisées par l'utilisateur.
 
     """
+    ordre_initialisation = 0
+    ordre_boucle = 0
+    periode_tours = 1
+    periode_secondes = 0
+
     def __init__(self, importeur, parser_cmd, nom, m_type="inconnu"):
         """Constructeur d'un module.
         Par défaut, on lui attribue surtout un nom IDENTIFIANT, sans accents
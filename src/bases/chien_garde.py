@@ -0,0 +1,192 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""Ce fichier définit la classe ChienGarde, détaillée plus bas."""
+
+import os
+import sys
+import time
+import threading
+import traceback
+
+from bases.fonction import Fonction
+
+class ChienGarde:
+    """Cette classe surveille la boucle synchro depuis un thread séparé.
+
+    A chaque tour, la boucle synchro signale qu'elle est vivante (méthode
+    battement) en précisant la fonction (objet Fonction) qu'elle exécute.
+    L'importeur précise de son côté le module dont il exécute la méthode
+    boucle (attribut module).
+
+    Si aucun battement n'est reçu pendant plus de seuil_alerte secondes,
+    la boucle est considérée comme bloquée : les piles d'appels de tous
+    les threads sont enregistrées dans un fichier du dossier rep, avec
+    la fonction et le module en cours d'exécution. Si le blocage dure
+    plus de seuil_redemarrage secondes, la fonction de redémarrage (objet
+    Fonction) est appelée, une seule fois par blocage, avec le chien de
+    garde en paramètre. Attention : elle est appelée depuis le thread du
+    chien de garde, pas depuis celui de la boucle synchro.
+
+    Le chien de garde ne débloque rien lui-même : la fonction de
+    redémarrage ne peut agir sur la boucle synchro (arrêt de
+    l'ordonnanceur, interruption du thread principal) que si celle-ci
+    exécute du code Python. Un blocage dans un appel C n'est que signalé.
+
+    Tant qu'il n'est pas démarré, le chien de garde ne coûte rien.
+
+    """
+    def __init__(self):
+        """Constructeur du chien de garde, arrêté."""
+        self.actif = False
+        self.rep = None
+        self.seuil_alerte = 5
+        self.seuil_redemarrage = -1
+        self.fonction_redemarrage = Fonction(None)
+        self.logger = None
+        self.fonction = None # fonction en cours d'exécution
+        self.module = None # module en cours d'exécution
+        self.dernier_battement = time.monotonic()
+        self.nb_blocages = 0
+        self.declenche = False # la fonction de redémarrage a été appelée
+        self._thread = None
+        self._arret = threading.Event()
+
+    def demarrer(self, rep, seuil_alerte=5, seuil_redemarrage=-1, \
+            fonction_redemarrage=None, logger=None):
+        """Démarre le chien de garde.
+        -   rep : le dossier où sont enregistrées les piles d'appels
+        -   seuil_alerte : la durée (en secondes) sans battement au-delà de
+            laquelle les piles d'appels sont enregistrées
+        -   seuil_redemarrage : la durée (en secondes) sans battement
+            au-delà de laquelle la fonction de redémarrage est appelée
+            (-1 : jamais)
+        -   fonction_redemarrage : la fonction (objet Fonction) appelée
+        -   logger : le logger où sont signalés les blocages
+
+        """
+        if self.actif:
+            return
+
+        self.rep = rep
+        self.seuil_alerte = seuil_alerte
+        self.seuil_redemarrage = seuil_redemarrage
+        if fonction_redemarrage is not None:
+            self.fonction_redemarrage = fonction_redemarrage
+        self.logger = logger
+        self.dernier_battement = time.monotonic()
+        self.actif = True
+        self._arret.clear()
+        self._thread = threading.Thread(target=self.surveiller, \
+                name="chien_garde", daemon=True)
+        self._thread.start()
+
+    def arreter(self):
+        """Arrête le chien de garde."""
+        if not self.actif:
+            return
+
+        self.actif = False
+        self._arret.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def battement(self, fonction=None):
+        """Signale que la boucle synchro est vivante et qu'elle commence
+        à exécuter la fonction passée en paramètre.
+
+        """
+        self.dernier_battement = time.monotonic()
+        self.fonction = fonction
+        self.module = None
+
+    def surveiller(self):
+        """Méthode exécutée par le thread du chien de garde."""
+        # On vérifie quatre fois par seuil d'alerte
+        intervalle = max(0.01, self.seuil_alerte / 4)
+        bloque = None # date du dernier battement du blocage signalé
+        redemarre = None
+        while not self._arret.wait(intervalle):
+            battement = self.dernier_battement
+            duree = time.monotonic() - battement
+            if duree < self.seuil_alerte:
+                continue
+
+            if bloque != battement:
+                bloque = battement
+                self.nb_blocages += 1
+                self.signaler(duree)
+
+            if self.seuil_redemarrage >= 0 and redemarre != battement and \
+                    duree >= self.seuil_redemarrage:
+                redemarre = battement
+                if self.logger:
+                    self.logger.fatal("Boucle synchro bloquée depuis " \
+                            "{0:.1f}s, redémarrage".format(duree))
+                self.declenche = True
+                self.fonction_redemarrage.executer(self)
+
+    def get_activite(self):
+        """Retourne la fonction et le module en cours d'exécution (str)."""
+        fonction = self.fonction
+        if fonction is None:
+            fonction = "inconnue"
+        elif isinstance(fonction, Fonction):
+            fonction = getattr(fonction.fonction, "__qualname__", \
+                    fonction.fonction)
+        module = self.module
+        if module is None:
+            module = "aucun"
+        else:
+            module = getattr(module, "nom", module)
+
+        return "fonction {0}, module {1}".format(fonction, module)
+
+    def signaler(self, duree):
+        """Signale un blocage : on enregistre les piles d'appels de tous
+        les threads dans un fichier.
+
+        """
+        activite = self.get_activite()
+        chemin = os.path.join(self.rep, time.strftime( \
+                "blocage_%Y%m%d_%H%M%S.txt"))
+        noms = {thread.ident: thread.name for thread in threading.enumerate()}
+        with open(chemin, "w") as fichier:
+            fichier.write("Boucle synchro bloquée depuis {0:.1f}s " \
+                    "({1})\n".format(duree, activite))
+            for ident, frame in sys._current_frames().items():
+                fichier.write("\nThread {0} ({1}) :\n".format( \
+                        noms.get(ident, "?"), ident))
+                fichier.write("".join(traceback.format_stack(frame)))
+
+        if self.logger:
+            self.logger.warning("Boucle synchro bloquée depuis {0:.1f}s " \
+                    "({1}), piles d'appels enregistrées dans {2}".format( \
+                    duree, activite, chemin))
@@ -0,0 +1,97 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce fichier définit la classe Histogramme, détaillée plus bas."""
+
+from bisect import bisect_left
+
+# Bornes supérieures des classes de l'histogramme, en secondes
+# (de 10 microsecondes à 1 seconde). Une dernière classe contient les
+# durées supérieures à la dernière borne.
+BORNES = (
+    0.00001, 0.00002, 0.00005,
+    0.0001, 0.0002, 0.0005,
+    0.001, 0.002, 0.005,
+    0.01, 0.02, 0.05,
+    0.1, 0.2, 0.5,
+    1,
+)
+
+class Histogramme:
+    """Cette classe représente un histogramme de durées.
+
+    Les durées ne sont pas conservées : on compte simplement le nombre
+    de durées tombant dans chaque classe (voir BORNES). L'ajout d'une
+    durée est donc en temps constant et l'histogramme occupe toujours
+    la même place, quel que soit le nombre de durées ajoutées.
+
+    On conserve aussi le nombre de durées, leur total et leur maximum.
+
+    """
+    def __init__(self):
+        """Constructeur de l'histogramme, vide."""
+        self.comptes = [0] * (len(BORNES) + 1)
+        self.nb = 0
+        self.total = 0
+        self.max = 0
+
+    def _get_moyenne(self):
+        """Retourne la durée moyenne."""
+        return self.total / self.nb if self.nb else 0
+
+    moyenne = property(_get_moyenne)
+
+    def ajouter(self, duree):
+        """Ajoute une durée (en secondes) à l'histogramme."""
+        self.comptes[bisect_left(BORNES, duree)] += 1
+        self.nb += 1
+        self.total += duree
+        if duree > self.max:
+            self.max = duree
+
+    def percentile(self, pourcentage):
+        """Retourne une estimation du percentile demandé (entre 0 et 1) :
+        la borne supérieure de la classe le contenant, sans dépasser la
+        durée maximum.
+
+        """
+        if not self.nb:
+            return 0
+
+        rang = pourcentage * self.nb
+        cumul = 0
+        for i, compte in enumerate(self.comptes):
+            cumul += compte
+            if cumul >= rang and compte:
+                return min(BORNES[i], self.max) if i < len(BORNES) \
+                        else self.max
+
+        return self.max
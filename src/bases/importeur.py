@@ -54,8 +54,11 @@ inconnu pour l'importeur.
 
 import os
 import sys
+import time
 
 from abstraits.module import *
+from bases.profileur import Profileur
+from bases.chien_garde import ChienGarde
 
 REP_PRIMAIRES = "primaires"
 REP_SECONDAIRES = "secondaires"
@@ -67,6 +70,9 @@ class Importeur:
     
     On ne doit créer qu'un seul objet Importeur.
 
+    Les attributs de l'importeur commençant par un signe souligné (_) ne
+    sont pas des modules (voir get_modules).
+
     """
     nb_importeurs = 0
 
@@ -83,15 +89,43 @@ class Importeur:
             raise RuntimeError("{0} importeurs ont été créés".format( \
                 Importeur.nb_importeurs))
 
+        # Profileur du temps passé par chaque module dans sa boucle
+        self._profileur = Profileur()
+
+        # Chien de garde surveillant la boucle synchro
+        self._chien_garde = ChienGarde()
+
+        # Liste des modules appelés à chaque tour de boucle synchro
+        # (voir construire_dispatch)
+        self._dispatch = None
+        self._tour = 0 # numéro du tour de boucle synchro
+        self._echeances = {} # {nom_module:date du prochain appel}
+
     def __str__(self):
         """Retourne sous ue forme un peu plus lisible les modules importés."""
         ret = []
-        for nom_module in self.__dict__.keys():
+        for nom_module in self.get_modules().keys():
             ret.append("{0}: {1}".format(nom_module, getattr(self, \
                     nom_module)))
         ret.sort()
         return "\n".join(ret)
 
+    def _get_profileur(self):
+        """Retourne le profileur de l'importeur."""
+        return self._profileur
+
+    def _get_chien_garde(self):
+        """Retourne le chien de garde de l'importeur."""
+        return self._chien_garde
+
+    profileur = property(_get_profileur)
+    chien_garde = property(_get_chien_garde)
+
+    def get_modules(self):
+        """Retourne un dictionnaire {nom:module} des modules chargés."""
+        return {nom: module for nom, module in self.__dict__.items() \
+                if not nom.startswith("_")}
+
     def tout_charger(self):
         """Méthode appelée pour charger les modules primaires et secondaires.
         Par défaut, on importe tout mais on ne créée rien.
@@ -125,7 +159,7 @@ class Importeur:
         besoin pour interragir entre eux.
 
         """
-        for nom_module, module in self.__dict__.items():
+        for nom_module, module in self.get_modules().items():
             if type(module) is type: # on doit l'instancier
                 setattr(self, nom_module, module(self, parser_cmd))
 
@@ -139,36 +173,101 @@ class Importeur:
         tout_instancier doit être appelée auparavant.
         
         """
-        for module in self.__dict__.values():
+        for module in self.get_modules().values():
             if module.statut == INSTANCIE:
                 module.config()
 
     def tout_initialiser(self):
         """Méthode permettant d'initialiser tous les modules qui en ont besoin.
-        Les modules à initialiser sont ceux configuré.
+        Les modules à initialiser sont ceux configuré, par
+        ordre_initialisation croissant.
         
         """
-        for module in self.__dict__.values():
+        modules = sorted(self.get_modules().values(), \
+                key=lambda module: module.ordre_initialisation)
+        for module in modules:
             if module.statut == CONFIGURE:
                 module.init()
 
+        self.construire_dispatch()
+
     def tout_detruire(self):
         """Méthode permettant de détruire tous les modules qui en ont besoin.
         Les modules à détruire sont ceux initialisés.
         
         """
-        for module in self.__dict__.values():
+        for module in self.get_modules().values():
             if module.statut == INITIALISE:
                 module.detruire()
 
+    def construire_dispatch(self):
+        """Construit la liste des modules appelés à chaque tour de boucle
+        synchro. On n'y place que les modules instanciés qui redéfinissent
+        la méthode boucle, triés selon leur attribut ordre_boucle puis
+        leur nom.
+
+        Cette méthode est appelée après l'initialisation des modules et
+        à chaque chargement ou déchargement d'un module.
+
+        """
+        modules = []
+        for nom, module in self.get_modules().items():
+            if type(module) is type or module.statut == DETRUIT:
+                continue
+            if type(module).boucle is Module.boucle:
+                continue
+            modules.append(module)
+
+        modules.sort(key=lambda module: (module.ordre_boucle, module.nom))
+        self._dispatch = [(module, module.periode_tours,
+                module.periode_secondes) for module in modules]
+        self._echeances = {nom: date for nom, date in \
+                self._echeances.items() if nom in self.get_modules()}
+
+    def get_modules_tour(self):
+        """Retourne la liste des modules à appeler pendant ce tour,
+        dans l'ordre d'appel, en tenant compte de leur période.
+
+        """
+        if self._dispatch is None:
+            self.construire_dispatch()
+
+        tour = self._tour
+        maintenant = None
+        modules = []
+        for module, periode_tours, periode_secondes in self._dispatch:
+            if periode_tours > 1 and tour % periode_tours:
+                continue
+            if periode_secondes > 0:
+                if maintenant is None:
+                    maintenant = time.monotonic()
+                if maintenant < self._echeances.get(module.nom, 0):
+                    continue
+                self._echeances[module.nom] = maintenant + periode_secondes
+            modules.append(module)
+
+        return modules
+
     def boucle(self):
         """Méthode appelée à chaque tour de boucle synchro.
         Elle doit faire appel à la méthode boucle de chaque module primaire
-        ou secondaire.
+        ou secondaire (voir construire_dispatch et get_modules_tour).
+
+        Si le profileur est actif, c'est lui qui exécute le tour en
+        mesurant la durée de chaque module.
+
+        Le module en cours d'exécution est signalé au chien de garde.
         
         """
-        for module in self.__dict__.values():
-            module.boucle()
+        modules = self.get_modules_tour()
+        self._tour += 1
+        chien_garde = self._chien_garde
+        if self._profileur.actif:
+            self._profileur.executer_tour(modules, chien_garde)
+        else:
+            for module in modules:
+                chien_garde.module = module
+                module.boucle()
 
     def module_est_charge(self, nom):
         """Retourne True si le module est déjà chargé, False sinon.
@@ -179,7 +278,7 @@ class Importeur:
         configuré ou initialisé.
         
         """
-        return nom in self.__dict__.keys()
+        return nom in self.get_modules().keys()
 
     def charger_module(self, parser_cmd, m_type, nom):
         """Méthode permettant de charger un module en fonction de son type et
@@ -206,6 +305,7 @@ class Importeur:
             module = getattr(getattr(package, nom), \
                     nom.capitalize())
             setattr(self, nom, module(self, parser_cmd))
+            self.construire_dispatch()
 
     def decharger_module(self, m_type, nom):
         """Méthode permettant de décharger un module.
@@ -230,8 +330,9 @@ class Importeur:
                 del sys.modules[cle]
 
         if self.module_est_charge(nom):
-            getattr(self, nom).detuire()
+            getattr(self, nom).detruire()
             delattr(self, nom)
+            self.construire_dispatch()
         else:
             print("{0} n'est pas dans les attributs de l'importeur".format(nom))
 
@@ -256,6 +357,7 @@ class Importeur:
         if self.module_est_charge(nom) and getattr(self, nom).statut == \
                 CONFIGURE:
             getattr(self, nom).init()
+            self.construire_dispatch()
         else:
             print("{0} n'existe pas ou n'est pas configuré.".format(nom))
 
@@ -0,0 +1,195 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce fichier définit la classe Ordonnanceur, détaillée plus bas."""
+
+import time
+
+class Ordonnanceur:
+    """Cette classe cadence la boucle synchro.
+
+    Elle exécute la fonction de tour (en général importeur.boucle) à
+    fréquence fixe, par exemple 10 fois par seconde. Le temps restant
+    jusqu'au tour suivant est confié à la fonction d'attente (en général
+    serveur.verifier), appelée avec le temps d'attente maximum en
+    paramètre : elle peut rendre la main plus tôt, elle est alors appelée
+    de nouveau avec le temps restant.
+
+    Si un tour dure plus longtemps que la période, l'ordonnanceur a du
+    retard. Deux politiques sont possibles :
+    -   le rattrapage (rattrapage=True) : les tours en retard sont
+        exécutés à la suite, sans attente (mais en surveillant tout de
+        même le réseau), dans la limite de nb_max_rattrapage tours. Au-delà,
+        les tours sont sautés
+    -   le saut (rattrapage=False) : les tours en retard sont sautés,
+        on reprend au prochain tour prévu
+
+    Si un chien de garde est précisé (voir bases/chien_garde.py), on lui
+    envoie un battement avant chaque appel de la fonction de tour ou de
+    la fonction d'attente.
+
+    Les statistiques suivantes sont tenues à jour :
+    -   nb_tours : le nombre de tours exécutés
+    -   nb_depassements : le nombre de tours ayant dépassé la période
+    -   nb_tours_sautes : le nombre de tours sautés
+    -   duree_derniere, duree_max, duree_totale : la durée des tours
+    -   retard_dernier, retard_max, retard_total : le retard des tours
+        sur la date prévue
+
+    """
+    def __init__(self, fonction_tour, fonction_attente, frequence=10, \
+            rattrapage=True, nb_max_rattrapage=5, chien_garde=None, \
+            fonction_fin_tour=None):
+        """Constructeur de l'ordonnanceur.
+        -   fonction_tour : la fonction (objet Fonction) exécutée à chaque
+            tour
+        -   fonction_attente : la fonction (objet Fonction) appelée avec le
+            temps d'attente maximum (en secondes) jusqu'au prochain tour
+        -   frequence : le nombre de tours par seconde
+        -   rattrapage : True pour rattraper les tours en retard, False
+            pour les sauter
+        -   nb_max_rattrapage : le nombre maximum de tours en retard
+            rattrapés
+        -   chien_garde : le chien de garde surveillant la boucle, ou None
+        -   fonction_fin_tour : la fonction (objet Fonction) appelée une
+            fois à la fin de chaque tour, ou None (relevé de statistiques
+            par exemple)
+
+        """
+        self.fonction_tour = fonction_tour
+        self.fonction_attente = fonction_attente
+        self.periode = 1 / frequence
+        self.rattrapage = rattrapage
+        self.nb_max_rattrapage = nb_max_rattrapage
+        self.chien_garde = chien_garde
+        self.fonction_fin_tour = fonction_fin_tour
+        self.actif = False
+        self.prochain_tour = None # date (time.monotonic) du prochain tour
+
+        # Statistiques
+        self.nb_tours = 0
+        self.nb_depassements = 0
+        self.nb_tours_sautes = 0
+        self.duree_derniere = 0
+        self.duree_max = 0
+        self.duree_totale = 0
+        self.retard_dernier = 0
+        self.retard_max = 0
+        self.retard_total = 0
+
+    @property
+    def frequence(self):
+        """Retourne la fréquence (nombre de tours par seconde)."""
+        return 1 / self.periode
+
+    @property
+    def duree_moyenne(self):
+        """Retourne la durée moyenne d'un tour."""
+        return self.duree_totale / self.nb_tours if self.nb_tours else 0
+
+    @property
+    def retard_moyen(self):
+        """Retourne le retard moyen d'un tour."""
+        return self.retard_total / self.nb_tours if self.nb_tours else 0
+
+    def __str__(self):
+        return "{0} tours à {1:g} Hz, durée moyenne {2:.2f} ms " \
+                "(max {3:.2f} ms), retard moyen {4:.2f} ms (max {5:.2f} ms), " \
+                "{6} dépassements, {7} tours sautés".format(self.nb_tours,
+                self.frequence, self.duree_moyenne * 1000,
+                self.duree_max * 1000, self.retard_moyen * 1000,
+                self.retard_max * 1000, self.nb_depassements,
+                self.nb_tours_sautes)
+
+    def tourner(self):
+        """Exécute les tours jusqu'à l'appel de la méthode arreter."""
+        self.actif = True
+        self.prochain_tour = time.monotonic()
+        while self.actif:
+            self.attendre()
+            if self.actif:
+                self.executer_tour()
+
+    def arreter(self):
+        """Arrête l'ordonnanceur à la fin du tour ou de l'attente en
+        cours.
+
+        """
+        self.actif = False
+
+    def attendre(self):
+        """Confie le temps restant jusqu'au prochain tour à la fonction
+        d'attente. Elle est appelée au moins une fois, même si le tour
+        est en retard (le réseau est ainsi toujours surveillé).
+
+        """
+        attente = self.prochain_tour - time.monotonic()
+        while True:
+            if self.chien_garde is not None:
+                self.chien_garde.battement(self.fonction_attente)
+            self.fonction_attente.executer(max(0, attente))
+            attente = self.prochain_tour - time.monotonic()
+            if attente <= 0 or not self.actif:
+                break
+
+    def executer_tour(self):
+        """Exécute un tour et calcule la date du suivant."""
+        debut = time.monotonic()
+        retard = debut - self.prochain_tour
+
+        # Tours en retard, au-delà de celui-ci
+        en_retard = int(retard / self.periode)
+        if en_retard > 0:
+            if self.rattrapage:
+                en_retard = max(0, en_retard - self.nb_max_rattrapage)
+            if en_retard > 0:
+                self.nb_tours_sautes += en_retard
+                self.prochain_tour += en_retard * self.periode
+                retard -= en_retard * self.periode
+
+        if self.chien_garde is not None:
+            self.chien_garde.battement(self.fonction_tour)
+        self.fonction_tour.executer()
+        if self.fonction_fin_tour is not None:
+            self.fonction_fin_tour.executer()
+        duree = time.monotonic() - debut
+
+        self.nb_tours += 1
+        self.duree_derniere = duree
+        self.duree_max = max(self.duree_max, duree)
+        self.duree_totale += duree
+        self.retard_dernier = retard
+        self.retard_max = max(self.retard_max, retard)
+        self.retard_total += retard
+        if duree > self.periode:
+            self.nb_depassements += 1
+
+        self.prochain_tour += self.periode
@@ -74,9 +74,11 @@ class ParserCMD(dict):
         # - h (help) : l'aide bien entendu
         # - l (chemin-logs) : chemin d'enregistrement des logs
         # - p (port) : port d'écoute du serveur
-        flags_courts = "c:e:hl:p:"
+        # - r (reprise) : chemin du fichier de reprise, lors d'un
+        #                 redémarrage à chaud
+        flags_courts = "c:e:hl:p:r:"
         flags_longs = ["chemin-configuration=", "chemin-enregistrement=", \
-                "help", "chemin-logs=", "port="]
+                "help", "chemin-logs=", "port=", "reprise="]
         
         # Création de l'objet analysant la ligne de commande
         try:
@@ -107,6 +109,8 @@ class ParserCMD(dict):
                     sys.exit(1)
                 else:
                     self["port"] = port
+            elif nom in ["-r", "--reprise"]:
+                self["reprise"] = val
 
 
     def help(self):
@@ -121,4 +125,6 @@ class ParserCMD(dict):
             "-e, chemin-enregistrement\n" \
             "-h, help : affiche ce message d'aide\n" \
             "-l, chemin-logs\n" \
-            "-p, port : paramètre le port d'écoute du serveur")
+            "-p, port : paramètre le port d'écoute du serveur\n" \
+            "-r, reprise : reprend les connexions après un redémarrage " \
+            "à chaud")
@@ -0,0 +1,148 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce fichier définit la classe Profileur, détaillée plus bas."""
+
+import time
+import collections
+
+from bases.histogramme import Histogramme
+
+class Profileur:
+    """Cette classe mesure le temps passé par chaque module dans sa
+    méthode boucle, à chaque tour de boucle synchro.
+
+    Quand le profileur est actif, l'importeur lui confie l'exécution du
+    tour (voir executer_tour). Pour chaque module, la durée est ajoutée
+    à un histogramme (voir bases/histogramme.py). Les derniers tours
+    sont aussi conservés en détail dans un historique de taille fixe.
+
+    Quand il est inactif, l'importeur exécute le tour lui-même : le
+    profileur ne coûte alors rien.
+
+    Les mesures peuvent être consultées à tout moment (méthode rapport)
+    ou enregistrées dans un fichier (méthode enregistrer).
+
+    """
+    def __init__(self, taille_historique=600):
+        """Constructeur du profileur.
+        -   taille_historique : le nombre de tours conservés en détail
+
+        """
+        self.actif = False
+        self.taille_historique = taille_historique
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        """Efface les mesures."""
+        self.debut = time.time()
+        self.histogrammes = {} # {nom_module:histogramme}
+        self.histogramme_tour = Histogramme()
+
+        # Historique des derniers tours
+        # Chaque tour est un tuple (date, durée du tour, {nom_module:durée})
+        self.historique = collections.deque(maxlen=self.taille_historique)
+
+    def activer(self):
+        """Active le profileur."""
+        self.actif = True
+
+    def desactiver(self):
+        """Désactive le profileur. Les mesures sont conservées."""
+        self.actif = False
+
+    def executer_tour(self, modules, chien_garde=None):
+        """Exécute la méthode boucle de chaque module en mesurant sa
+        durée. Si un chien de garde est précisé, on lui signale le module
+        en cours d'exécution.
+
+        """
+        horloge = time.perf_counter
+        durees = {}
+        debut_tour = horloge()
+        for module in modules:
+            if chien_garde is not None:
+                chien_garde.module = module
+            debut = horloge()
+            module.boucle()
+            durees[module.nom] = horloge() - debut
+        duree_tour = horloge() - debut_tour
+
+        histogrammes = self.histogrammes
+        for nom, duree in durees.items():
+            histogramme = histogrammes.get(nom)
+            if histogramme is None:
+                histogramme = histogrammes[nom] = Histogramme()
+            histogramme.ajouter(duree)
+
+        self.histogramme_tour.ajouter(duree_tour)
+        self.historique.append((time.time(), duree_tour, durees))
+
+    def rapport(self):
+        """Retourne le rapport des mesures (str), sous la forme d'un
+        tableau : une ligne par module, triées par temps total décroissant.
+        Les durées sont en millisecondes.
+
+        """
+        lignes = []
+        lignes.append("Profilage depuis {0:.0f} s ({1})".format(
+                time.time() - self.debut,
+                "actif" if self.actif else "inactif"))
+        lignes.append("{0:<16} {1:>8} {2:>10} {3:>9} {4:>9} {5:>9} " \
+                "{6:>9}".format("module", "tours", "total", "moyenne",
+                "p50", "p99", "max"))
+        histogrammes = sorted(self.histogrammes.items(),
+                key=lambda couple: couple[1].total, reverse=True)
+        histogrammes.append(("(tour)", self.histogramme_tour))
+        for nom, histogramme in histogrammes:
+            lignes.append("{0:<16} {1:>8} {2:>10.1f} {3:>9.3f} {4:>9.3f} " \
+                    "{5:>9.3f} {6:>9.3f}".format(nom, histogramme.nb,
+                    histogramme.total * 1000, histogramme.moyenne * 1000,
+                    histogramme.percentile(0.5) * 1000,
+                    histogramme.percentile(0.99) * 1000,
+                    histogramme.max * 1000))
+
+        return "\n".join(lignes)
+
+    def enregistrer(self, chemin):
+        """Enregistre le rapport et l'historique des derniers tours dans
+        le fichier précisé.
+
+        """
+        with open(chemin, "w") as fichier:
+            fichier.write(self.rapport() + "\n\n")
+            fichier.write("Derniers tours (durées en millisecondes)\n")
+            for date, duree_tour, durees in self.historique:
+                details = " ".join("{0}={1:.3f}".format(nom, duree * 1000)
+                        for nom, duree in durees.items())
+                fichier.write("{0} {1:.3f} {2}\n".format(time.strftime(
+                        "%H:%M:%S", time.localtime(date)), duree_tour * 1000,
+                        details))
@@ -34,9 +34,18 @@ Vous pouvez le renommer en fonction du nom choisi de votre projet.
 
 """
 
+import os
+import time
+import signal
+import _thread
+import threading
+
 from reseau.connexions.serveur import *
 from reseau.fonctions.callbacks import *
+from reseau.fonctions.redemarrage import redemarrer, reprendre
 from bases.importeur import Importeur
+from bases.ordonnanceur import Ordonnanceur
+from bases.fonction import Fonction
 from bases.parser_cmd import ParserCMD
 
 # Changez ici le port par défaut
@@ -65,12 +74,83 @@ importeur.tout_initialiser()
 # On se créée un logger
 log = importeur.log.creer_logger("", "sup", "kassie.log")
 
+# On charge la configuration du serveur
+# Note: le fichier de configuration est créé avec les valeurs par défaut
+# s'il n'existe pas encore
+config_serveur = importeur.anaconf.charger_config("serveur.cfg", {
+    # Propose aux clients la compression des messages envoyés (MCCP v2)
+    "compression": True,
+    # Propose aux clients de négocier leur encodage (option telnet CHARSET)
+    # Sinon, ou s'ils refusent, l'encodage est détecté
+    "negociation_encodage": True,
+    # Contrôle du débit en réception de chaque client (-1 : aucune limite)
+    # Nombre de messages par seconde et nombre de messages d'une rafale
+    "lignes_par_seconde": 10,
+    "rafale_lignes": 20,
+    # Nombre d'octets par seconde et nombre d'octets d'une rafale
+    "octets_par_seconde": 16384,
+    "rafale_octets": 65536,
+    # Nombre maximum d'octets reçus en attente de traitement
+    "taille_max_entree": 65536,
+    # Politique en cas de dépassement : 'ignorer', 'retarder' ou
+    # 'deconnecter'
+    "politique_debordement": "'retarder'",
+    # Taille de la file d'attente des connexions du socket serveur
+    "nb_clients_attente": 128,
+    # Nombre de connexions par seconde acceptées depuis une même adresse IP
+    # (-1 : aucune limite), nombre de connexions d'une rafale et nombre
+    # d'adresses IP retenues
+    "connexions_par_ip": 1,
+    "rafale_connexions_ip": 10,
+    "taille_table_ip": 4096,
+    # Délai (en secondes) au bout duquel un client inactif est déconnecté
+    # (-1 : jamais)
+    "delai_inactivite": 3600,
+    # Délai (en secondes) au bout duquel un client non authentifié est
+    # déconnecté (-1 : jamais)
+    "delai_authentification": -1,
+    # Keepalive TCP, pour détecter les connexions mortes : délai sans
+    # échange avant le premier keepalive, intervalle entre deux keepalive
+    # et nombre de keepalive sans réponse avant de couper la connexion
+    "keepalive": True,
+    "keepalive_inactivite": 60,
+    "keepalive_intervalle": 10,
+    "keepalive_essais": 5,
+    # Délai (en secondes) au bout duquel des données envoyées et non
+    # acquittées coupent la connexion (-1 : comportement du système)
+    "delai_tcp": 120,
+})
+
 # Vous pouvez changer les paramètres du serveur, telles que spécifiées dans
 # le constructeur de ServeurConnexion (voir reseau/connexions/serveur.py)
 # Par défaut, on précise simplement son port d'écoute.
 
-serveur = ConnexionServeur(PORT)
-serveur.init() # Initialisation, le socket serveur se met en écoute
+serveur = ConnexionServeur(PORT,
+        nb_clients_attente=config_serveur.nb_clients_attente,
+        compression=config_serveur.compression,
+        negociation_encodage=config_serveur.negociation_encodage,
+        lignes_par_seconde=config_serveur.lignes_par_seconde,
+        rafale_lignes=config_serveur.rafale_lignes,
+        octets_par_seconde=config_serveur.octets_par_seconde,
+        rafale_octets=config_serveur.rafale_octets,
+        taille_max_entree=config_serveur.taille_max_entree,
+        politique_debordement=config_serveur.politique_debordement,
+        connexions_par_ip=config_serveur.connexions_par_ip,
+        rafale_connexions_ip=config_serveur.rafale_connexions_ip,
+        taille_table_ip=config_serveur.taille_table_ip,
+        delai_inactivite=config_serveur.delai_inactivite,
+        delai_authentification=config_serveur.delai_authentification,
+        keepalive=config_serveur.keepalive,
+        keepalive_inactivite=config_serveur.keepalive_inactivite,
+        keepalive_intervalle=config_serveur.keepalive_intervalle,
+        keepalive_essais=config_serveur.keepalive_essais,
+        delai_tcp=config_serveur.delai_tcp)
+# Si on redémarre à chaud, on reprend le socket serveur et les clients
+# du processus précédent. Sinon, on initialise le serveur
+if "reprise" in parser_cmd.keys():
+    reprendre(serveur, log, parser_cmd["reprise"])
+else:
+    serveur.init() # Initialisation, le socket serveur se met en écoute
 log.info("Le serveur est à présent en écoute sur le port {0}".format(PORT))
 
 # Configuration des fonctions de callback
@@ -91,12 +171,149 @@ serveur.callbacks["deconnexion"].args = (serveur, importeur, log)
 serveur.callbacks["reception"].fonction = cb_reception
 serveur.callbacks["reception"].args = (serveur, importeur, log)
 
+# Fonction de callback appelée quand une connexion est refusée
+serveur.callbacks["refus"].fonction = cb_refus
+serveur.callbacks["refus"].args = (serveur, importeur, log)
+
+# Fonction de callback appelée quand un client dépasse son débit en réception
+serveur.callbacks["debordement"].fonction = cb_debordement
+serveur.callbacks["debordement"].args = (serveur, importeur, log)
+
 # Lancement de la boucle synchro
 # Note: tout se déroule ici, dans une boucle temps réelle qui se répète
 # jusqu'à l'arrêt du MUD. De cette manière, on garde le contrôle total
 # sur le flux d'instructions.
 
-while True:
-    importeur.boucle()
-    serveur.verifier_connexions()
-    serveur.verifier_receptions()
+# La boucle est cadencée par l'ordonnanceur : à chaque tour, il exécute
+# importeur.boucle, puis consacre le temps restant jusqu'au tour suivant
+# à surveiller les connexions et les messages des clients.
+config_synchro = importeur.anaconf.charger_config("synchro.cfg", {
+    # Nombre de tours de boucle synchro par seconde
+    "frequence": 10,
+    # Si un tour dure trop longtemps, les tours en retard sont rattrapés
+    # (True) ou sautés (False)
+    "rattrapage": True,
+    # Nombre maximum de tours rattrapés, les suivants sont sautés
+    "nb_max_rattrapage": 5,
+    # Mesure du temps passé par chaque module à chaque tour
+    # Le signal SIGUSR2 enregistre les mesures dans le dossier des logs
+    "profilage": False,
+    # Chien de garde : si un tour de boucle synchro dure plus de
+    # seuil_alerte secondes, les piles d'appels sont enregistrées dans le
+    # dossier des logs (-1 : pas de chien de garde). Au-delà de
+    # seuil_redemarrage secondes, le MUD est redémarré à chaud (-1 : jamais)
+    "seuil_alerte": 5,
+    "seuil_redemarrage": 60,
+})
+
+ordonnanceur = Ordonnanceur(Fonction(importeur.boucle),
+        Fonction(serveur.verifier), frequence=config_synchro.frequence,
+        rattrapage=config_synchro.rattrapage,
+        nb_max_rattrapage=config_synchro.nb_max_rattrapage,
+        chien_garde=importeur.chien_garde,
+        fonction_fin_tour=Fonction(serveur.fin_tour))
+
+# Le signal SIGHUP demande un redémarrage à chaud : il a lieu entre deux
+# tours de boucle, aucune connexion n'est fermée
+redemarrage = []
+def demander_redemarrage(signum, frame):
+    """Demande un redémarrage à chaud (signal SIGHUP)."""
+    redemarrage.append(signum)
+    ordonnanceur.arreter()
+
+if hasattr(signal, "SIGHUP"):
+    signal.signal(signal.SIGHUP, demander_redemarrage)
+
+# Le signal SIGUSR2 enregistre les mesures du profileur
+if config_synchro.profilage:
+    importeur.profileur.activer()
+
+def enregistrer_profilage(signum, frame):
+    """Enregistre les mesures du profileur (signal SIGUSR2)."""
+    chemin = os.path.join(log.rep_complet, time.strftime(
+            "profilage_%Y%m%d_%H%M%S.txt"))
+    importeur.profileur.enregistrer(chemin)
+    log.info("Mesures du profileur enregistrées dans {0}".format(chemin))
+
+if hasattr(signal, "SIGUSR2"):
+    signal.signal(signal.SIGUSR2, enregistrer_profilage)
+
+# Si la boucle synchro reste bloquée trop longtemps, le chien de garde
+# demande un redémarrage à chaud : il a lieu, comme pour SIGHUP, à la fin
+# du tour bloqué, si celui-ci finit par se terminer. Sinon, seuil_alerte
+# secondes plus tard, le thread principal est interrompu
+# (KeyboardInterrupt) : l'état des clients a pu être interrompu en pleine
+# mise à jour, on ne le transmet donc pas à un nouveau processus, on
+# arrête proprement le MUD.
+# Note: seuls les blocages dans du code Python peuvent être ainsi
+# débloqués. Un thread principal bloqué dans un appel C (appel système
+# sans délai, extension...) n'est pas interrompu.
+# L'interruption n'est demandée que tant que la boucle n'a pas rendu la
+# main (boucle_active, protégé par verrou_boucle) : une fois la boucle
+# terminée, la minuterie est arrêtée et une éventuelle interruption
+# encore en attente est ignorée (voir terminer_boucle).
+boucle_active = []
+verrou_boucle = threading.Lock()
+def interrompre():
+    """Interrompt la boucle synchro si elle n'a pas rendu la main."""
+    with verrou_boucle:
+        if boucle_active:
+            _thread.interrupt_main()
+
+minuterie = threading.Timer(max(0, config_synchro.seuil_alerte), interrompre)
+minuterie.daemon = True
+
+def debloquer(chien_garde):
+    """Demande le redémarrage de la boucle synchro bloquée (thread du
+    chien de garde).
+
+    """
+    redemarrage.append(None)
+    ordonnanceur.arreter()
+    minuterie.start()
+
+def ignorer_interruption(signum, frame):
+    """Ignore une interruption arrivée après la fin de la boucle synchro."""
+    pass
+
+def terminer_boucle():
+    """Appelée quand la boucle synchro rend la main, normalement ou non.
+    On arrête le chien de garde et la minuterie ; l'arrêt ou le
+    redémarrage du MUD ne doit ensuite plus être interrompu.
+
+    """
+    # Une interruption demandée juste avant la fin de la boucle peut ne
+    # pas encore avoir été reçue : elle sera ignorée
+    signal.signal(signal.SIGINT, ignorer_interruption)
+    with verrou_boucle:
+        boucle_active.clear()
+    importeur.chien_garde.arreter()
+    minuterie.cancel()
+    if minuterie.ident is not None:
+        minuterie.join()
+
+if config_synchro.seuil_alerte >= 0:
+    importeur.chien_garde.demarrer(log.rep_complet,
+            seuil_alerte=config_synchro.seuil_alerte,
+            seuil_redemarrage=config_synchro.seuil_redemarrage,
+            fonction_redemarrage=Fonction(debloquer), logger=log)
+
+boucle_active.append(True)
+try:
+    try:
+        ordonnanceur.tourner()
+    finally:
+        terminer_boucle()
+except KeyboardInterrupt:
+    if importeur.chien_garde.declenche:
+        log.fatal("Boucle synchro interrompue, arrêt du MUD : {0}".format(
+                ordonnanceur))
+        importeur.tout_detruire()
+        raise SystemExit(1)
+    else:
+        log.info("Arrêt du MUD : {0}".format(ordonnanceur))
+        importeur.tout_detruire()
+else:
+    log.info("Boucle synchro : {0}".format(ordonnanceur))
+    if redemarrage:
+        redemarrer(serveur, importeur, log)
@@ -0,0 +1,351 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""Fichier contenant la classe Calpar définissant le module primaire
+du même nom.
+
+"""
+
+import time
+import queue
+import pickle
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from abstraits.module import *
+from bases.histogramme import Histogramme
+from primaires.calpar.calcul import Calcul
+from primaires.calpar import travailleur
+
+class Calpar(Module):
+    """Cette classe contient les informations du module primaire calpar.
+    Ce module permet d'exécuter des calculs coûteux dans d'autres
+    processus.
+
+    Un calcul qui occupe le processeur (recherche de chemins en masse,
+    génération du monde, recalcul de statistiques...) paralyse la boucle
+    synchro. Le confier à un thread (voir le module tacfon) ne suffit pas :
+    à cause du GIL, un seul thread exécute du code Python à la fois. Ce
+    module confie donc ces calculs à un groupe de processus travailleurs
+    (voir concurrent.futures.ProcessPoolExecutor).
+
+    Les fonctions confiées doivent être pures : elles sont transmises au
+    processus par pickle (ce doivent donc être des fonctions définies au
+    niveau d'un module), de même que leurs paramètres et leur résultat,
+    et ne peuvent ni lire ni modifier l'état du MUD. La taille des données
+    échangées est mesurée : des données trop volumineuses coûtent plus
+    cher à sérialiser que le calcul lui-même.
+
+    Comme pour le module tacfon, le résultat est traité dans la boucle
+    synchro : à chaque tour, on appelle la fonction de fin de chaque
+    calcul terminé (voir primaires/calpar/calcul.py).
+
+    Les processus sont créés et préparés (voir rechauffer) à
+    l'initialisation du module, pour que le premier calcul n'ait pas à
+    les attendre, et arrêtés proprement à sa destruction.
+
+    Le MUD étant lancé en tant que script, sans protection de son code
+    principal, les processus sont créés par fork (les méthodes spawn et
+    forkserver exécuteraient de nouveau kassie.py dans chaque processus).
+    Un fork n'est sûr que si le processus ne contient qu'un seul thread :
+    le module est donc initialisé avant tous les autres (voir
+    ordre_initialisation) et crée tous ses processus à l'initialisation,
+    avant que le chien de garde ou les threads du module tacfon ne
+    démarrent.
+
+    Si un processus travailleur meurt (manque de mémoire, erreur fatale),
+    le groupe de processus est inutilisable : les calculs en cours se
+    terminent en erreur (BrokenProcessPool) et le groupe est recréé. Ses
+    processus sont alors créés alors que d'autres threads existent ; ils
+    n'exécutent que des fonctions pures, ce qui limite le risque.
+
+    """
+    # Le module crée ses processus avant que d'autres modules ne créent
+    # des threads
+    ordre_initialisation = -1
+
+    def __init__(self, importeur, parser_cmd):
+        """Constructeur du module"""
+        Module.__init__(self, importeur, parser_cmd, "calpar", "primaire")
+        self.logger = None
+        self.executeur = None
+        self.nb_processus = 2
+        self.taille_max_file = 64
+        self.taille_alerte = 1048576
+        self.modules_precharges = []
+        self.id_courant = 0
+        self.generation = 0 # incrémenté à chaque création du groupe
+        self.calculs = {} # {id_calcul:calcul} en cours
+        self.termines = queue.SimpleQueue()
+
+        # Statistiques
+        self.nb_termines = 0
+        self.nb_erreurs = 0
+        self.nb_annules = 0
+        self.nb_refuses = 0
+        self.nb_reconstructions = 0
+        self.octets_envoyes = 0
+        self.octets_recus = 0
+        self.taille_max_envoi = 0
+        self.taille_max_retour = 0
+        self.histogramme_duree = Histogramme()
+        self.histogramme_delai = Histogramme()
+
+    def config(self):
+        """Redéfinition de la configuration du module.
+        On créée un logger portant le nom du module.
+
+        """
+        self.logger = self.importeur.log.creer_logger("calpar", "calpar")
+        Module.config(self)
+
+    def init(self):
+        """Initialisation du module.
+        On charge la configuration (tous les modules sont alors configurés),
+        on créée les processus travailleurs et on les prépare.
+
+        """
+        config = self.importeur.anaconf.charger_config("calpar.cfg", {
+            # Nombre de processus travailleurs
+            "nb_processus": 2,
+            # Nombre maximum de calculs en cours, au-delà duquel les
+            # nouveaux calculs sont refusés (-1 : aucune limite)
+            "taille_max_file": 64,
+            # Taille (en octets) des données échangées avec un processus
+            # au-delà de laquelle un avertissement est enregistré
+            "taille_alerte": 1048576,
+            # Modules importés par chaque processus à sa création
+            "modules_precharges": [],
+            # Temps d'attente maximum (en secondes) de la préparation des
+            # processus
+            "delai_rechauffement": 10,
+        })
+        self.nb_processus = config.nb_processus
+        self.taille_max_file = config.taille_max_file
+        self.taille_alerte = config.taille_alerte
+        self.modules_precharges = config.modules_precharges
+        self.creer_executeur()
+        self.rechauffer(config.delai_rechauffement)
+        Module.init(self)
+
+    def creer_executeur(self):
+        """Crée le groupe de processus travailleurs.
+        Les processus sont créés par fork (voir la documentation de la
+        classe et travailleur.initialiser).
+
+        """
+        self.executeur = ProcessPoolExecutor( \
+                max_workers=self.nb_processus, \
+                mp_context=multiprocessing.get_context("fork"), \
+                initializer=travailleur.initialiser, \
+                initargs=(self.modules_precharges, ))
+        self.generation += 1
+
+    def reconstruire(self, erreur):
+        """Remplace le groupe de processus, devenu inutilisable."""
+        self.logger.warning("Groupe de processus inutilisable ({0!r}), " \
+                "il est recréé".format(erreur))
+        self.executeur.shutdown(wait=False, cancel_futures=True)
+        self.nb_reconstructions += 1
+        self.creer_executeur()
+
+    def rechauffer(self, delai):
+        """Crée les processus travailleurs et attend qu'ils soient prêts
+        (chacun importe à sa création les modules préchargés, voir
+        travailleur.initialiser). On attend au plus delai secondes.
+
+        """
+        futures = [self.executeur.submit(travailleur.rechauffer) \
+                for i in range(self.nb_processus)]
+        termines, en_cours = wait(futures, timeout=delai)
+        nb_prets = 0
+        for future in termines:
+            if future.exception() is not None:
+                self.logger.warning("Préparation d'un processus : " \
+                        "{0!r}".format(future.exception()))
+            else:
+                nb_prets += 1
+
+        self.logger.info("Processus travailleurs prêts ({0} préparation(s) " \
+                "réussie(s) sur {1})".format(nb_prets, self.nb_processus))
+
+    def detruire(self):
+        """Destruction du module.
+        Les calculs qui n'ont pas commencé sont annulés, on attend la fin
+        de ceux en cours puis l'arrêt des processus.
+
+        """
+        if self.executeur is not None:
+            self.executeur.shutdown(wait=True, cancel_futures=True)
+            self.executeur = None
+
+        Module.detruire(self)
+
+    def boucle(self):
+        """Redéfinition de la méthode boucle du Module.
+        On traite les calculs terminés.
+
+        """
+        self.traiter_termines()
+
+    def ajouter_calcul(self, fin, ref_fonc, *args, **kwargs):
+        """Cette méthode permet de confier un calcul aux processus
+        travailleurs. On précise :
+        -   la fonction de fin (un objet Fonction, ou None), appelée
+            depuis la boucle synchro avec le calcul en paramètre
+        -   la référence vers la fonction à exécuter, définie au niveau
+            d'un module
+        -   les paramètres non nommés organisés en tuple
+        -   les paramètres nommés organisés dans un dictionnaire
+
+        On retourne le calcul créé, ou None s'il a été refusé. Si la
+        fonction ou ses paramètres ne peuvent être sérialisés, l'exception
+        levée par pickle est propagée.
+
+        """
+        if self.executeur is None:
+            self.logger.warning("Le module calpar n'est pas initialisé, " \
+                    "le calcul {0} est refusé".format(ref_fonc))
+            self.nb_refuses += 1
+            return None
+
+        if self.taille_max_file >= 0 and \
+                len(self.calculs) >= self.taille_max_file:
+            self.logger.warning("{0} calculs en cours, le calcul {1} " \
+                    "est refusé".format(len(self.calculs), ref_fonc))
+            self.nb_refuses += 1
+            return None
+
+        donnees = pickle.dumps((ref_fonc, args, kwargs), \
+                pickle.HIGHEST_PROTOCOL)
+        self.id_courant += 1
+        calcul = Calcul(self.id_courant, fin, ref_fonc, len(donnees))
+        self.octets_envoyes += calcul.taille_envoi
+        if calcul.taille_envoi > self.taille_max_envoi:
+            self.taille_max_envoi = calcul.taille_envoi
+        if calcul.taille_envoi > self.taille_alerte:
+            self.logger.warning("Le calcul {0} ({1}) envoie {2} " \
+                    "octets".format(calcul.id, ref_fonc, \
+                    calcul.taille_envoi))
+
+        self.calculs[calcul.id] = calcul
+        calcul.generation = self.generation
+        try:
+            calcul.future = self.executeur.submit(travailleur.executer, \
+                    donnees)
+        except BrokenProcessPool as err:
+            # Le calcul échoue : sa fonction de fin sera appelée au
+            # prochain tour avec l'erreur
+            self.reconstruire(err)
+            calcul.erreur = err
+            self.termines.put(calcul)
+        else:
+            calcul.future.add_done_callback(lambda future: \
+                    self.termines.put(calcul))
+        return calcul
+
+    def annuler_calcul(self, calcul):
+        """Annule le calcul passé en paramètre.
+        S'il n'a pas commencé, il ne sera pas exécuté. Sinon, son
+        résultat sera ignoré et sa fonction de fin ne sera pas appelée.
+
+        """
+        if calcul.id not in self.calculs or calcul.annule:
+            return
+
+        calcul.annule = True
+        self.nb_annules += 1
+        if calcul.future is not None:
+            calcul.future.cancel()
+
+    def traiter_termines(self):
+        """Traite les calculs terminés.
+        Pour chaque calcul, on récupère son résultat, on met à jour les
+        statistiques, puis on appelle sa fonction de fin, sauf s'il a été
+        annulé.
+
+        """
+        while True:
+            try:
+                calcul = self.termines.get_nowait()
+            except queue.Empty:
+                break
+
+            self.calculs.pop(calcul.id, None)
+            if calcul.annule:
+                continue
+
+            calcul.date_reception = time.monotonic()
+            self.histogramme_delai.ajouter(calcul.delai)
+            if calcul.future is None:
+                erreur = calcul.erreur
+            else:
+                erreur = calcul.future.exception()
+                # Un processus est mort : le groupe est inutilisable
+                if isinstance(erreur, BrokenProcessPool) and \
+                        calcul.generation == self.generation and \
+                        self.executeur is not None:
+                    self.reconstruire(erreur)
+            if erreur is None:
+                donnees, calcul.duree = calcul.future.result()
+                calcul.taille_retour = len(donnees)
+                calcul.resultat = pickle.loads(donnees)
+                self.octets_recus += calcul.taille_retour
+                self.histogramme_duree.ajouter(calcul.duree)
+                if calcul.taille_retour > self.taille_max_retour:
+                    self.taille_max_retour = calcul.taille_retour
+                if calcul.taille_retour > self.taille_alerte:
+                    self.logger.warning("Le calcul {0} ({1}) retourne " \
+                            "{2} octets".format(calcul.id, \
+                            calcul.fonction, calcul.taille_retour))
+            else:
+                calcul.erreur = erreur
+                self.nb_erreurs += 1
+                self.logger.warning("Le calcul {0} ({1}) a levé " \
+                        "l'exception {2!r}".format(calcul.id, \
+                        calcul.fonction, erreur))
+
+            self.nb_termines += 1
+            calcul.terminer()
+
+    def stats(self):
+        """Retourne les statistiques du module (str)."""
+        return "{0} calcul(s) en cours, {1} terminé(s) dont {2} en " \
+                "erreur, {3} annulé(s), {4} refusé(s), {5} octets " \
+                "envoyés (max {6}), {7} octets reçus (max {8}), durée " \
+                "moyenne {9:.1f}ms, délai moyen {10:.1f}ms, {11} " \
+                "reconstruction(s) du groupe".format( \
+                len(self.calculs), self.nb_termines, self.nb_erreurs, \
+                self.nb_annules, self.nb_refuses, self.octets_envoyes, \
+                self.taille_max_envoi, self.octets_recus, \
+                self.taille_max_retour, \
+                self.histogramme_duree.moyenne * 1000, \
+                self.histogramme_delai.moyenne * 1000, \
+                self.nb_reconstructions)
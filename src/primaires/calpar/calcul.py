@@ -0,0 +1,102 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""Ce fichier définit la classe Calcul, détaillée plus bas."""
+
+import time
+
+class Calcul:
+    """Cette classe représente un calcul confié au module calpar.
+
+    Un calcul est une fonction pure (recherche de chemins, génération
+    d'une partie du monde, recalcul de statistiques...) exécutée dans
+    un processus travailleur. La fonction et ses paramètres sont
+    transmis au processus par pickle : ils ne doivent donc pas faire
+    référence à l'état du MUD, qui n'existe pas dans le processus.
+
+    Une fois le calcul terminé, la fonction de fin (un objet Fonction,
+    voir bases/fonction.py) est appelée depuis la boucle synchro, en lui
+    passant le calcul en paramètre.
+
+    Un calcul contient :
+    -   un identifiant unique (int)
+    -   la fonction exécutée dans le processus
+    -   la fonction de fin (un objet Fonction ou None)
+    -   le résultat de la fonction, ou l'exception levée (erreur)
+    -   la taille (en octets) des données envoyées au processus et
+        reçues de celui-ci
+    -   la durée du calcul dans le processus et les dates de soumission
+        et de réception du résultat
+    -   la génération du groupe de processus auquel il a été confié
+
+    """
+    def __init__(self, id, fin, fonction, taille_envoi):
+        """Constructeur du calcul."""
+        self.id = id
+        self.fin = fin
+        self.fonction = fonction
+        self.future = None
+        self.generation = 0 # génération du groupe de processus
+        self.resultat = None
+        self.erreur = None
+        self.annule = False
+        self.taille_envoi = taille_envoi
+        self.taille_retour = 0
+        self.duree = None
+        self.date_soumission = time.monotonic()
+        self.date_reception = None
+
+    def __repr__(self):
+        """Retourne l'identifiant et l'état du calcul."""
+        if self.annule:
+            etat = "annulé"
+        elif self.date_reception is not None:
+            etat = "terminé"
+        else:
+            etat = "en cours"
+
+        return "<calcul {0} {1}>".format(self.id, etat)
+
+    def _get_delai(self):
+        """Retourne le temps (en secondes) écoulé entre la soumission
+        du calcul et la réception de son résultat, ou None si le résultat
+        n'a pas été reçu.
+
+        """
+        if self.date_reception is None:
+            return None
+
+        return self.date_reception - self.date_soumission
+
+    delai = property(_get_delai)
+
+    def terminer(self):
+        """Appelle la fonction de fin, depuis la boucle synchro."""
+        if self.fin is not None:
+            self.fin.executer(self)
@@ -0,0 +1,108 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""Ce fichier définit les fonctions exécutées dans les processus
+travailleurs du module calpar.
+
+Ces fonctions doivent rester au niveau du module pour pouvoir être
+transmises aux processus (par pickle, sous la forme d'une référence).
+
+"""
+
+import os
+import stat
+import time
+import pickle
+import sys
+import ctypes
+import signal
+import importlib
+
+# Option de prctl demandant un signal à la mort du processus parent (Linux)
+PR_SET_PDEATHSIG = 1
+
+def initialiser(modules):
+    """Initialise un processus travailleur, juste après sa création.
+
+    Le processus est une copie (fork) du processus du MUD : il hérite
+    de ses sockets (socket serveur et clients, y compris ceux repris lors
+    d'un redémarrage à chaud) et de ses gestionnaires de signaux. On ferme
+    les sockets, pour qu'une connexion fermée par le MUD le soit vraiment,
+    et on ignore les signaux destinés au MUD : c'est lui qui arrête ses
+    travailleurs. Sous Linux, on demande à recevoir SIGTERM si le MUD
+    meurt, pour ne pas lui survivre.
+
+    Enfin, on importe les modules précisés.
+
+    """
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL(None).prctl(PR_SET_PDEATHSIG, signal.SIGTERM)
+        except (OSError, AttributeError):
+            pass
+
+    for signum in ("SIGINT", "SIGHUP", "SIGUSR2"):
+        if hasattr(signal, signum):
+            signal.signal(getattr(signal, signum), signal.SIG_IGN)
+
+    try:
+        descripteurs = [int(fd) for fd in os.listdir("/proc/self/fd")]
+    except OSError:
+        descripteurs = range(os.sysconf("SC_OPEN_MAX"))
+
+    for fd in descripteurs:
+        if fd < 3:
+            continue
+        try:
+            mode = os.fstat(fd).st_mode
+        except OSError:
+            continue
+        if stat.S_ISSOCK(mode):
+            os.close(fd)
+
+    for nom in modules:
+        importlib.import_module(nom)
+
+def rechauffer():
+    """Tâche de préparation : on retourne le PID du processus, prêt."""
+    return os.getpid()
+
+def executer(donnees):
+    """Exécute un calcul dans le processus travailleur.
+
+    Le paramètre donnees contient la fonction et ses paramètres,
+    sérialisés par le MUD. On retourne le résultat sérialisé, pour
+    que le MUD connaisse sa taille, et la durée du calcul.
+
+    """
+    fonction, args, kwargs = pickle.loads(donnees)
+    debut = time.perf_counter()
+    resultat = fonction(*args, **kwargs)
+    duree = time.perf_counter() - debut
+    return pickle.dumps(resultat, pickle.HIGHEST_PROTOCOL), duree
@@ -33,8 +33,16 @@ du même nom.
 
 """
 
+import time
+
 from abstraits.module import *
 from primaires.diffact.action_differee import ActionDifferee
+from primaires.diffact.action_periodique import ActionPeriodique
+from primaires.diffact.file_tas import FileTas
+from primaires.diffact.roue_hierarchique import RoueHierarchique
+
+# Files d'attente disponibles (voir la configuration du module)
+FILES = ("tas", "roue")
 
 class Diffact(Module):
     """Cette classe contient les informations du module primaire diffact.
@@ -52,9 +60,11 @@ class Diffact(Module):
         un certain nombre de paramètres
     -   si un module primaire doit contrôler toutes les 60 secondes une
         information quelconque, il peut créer dès son initialisation
-        une action différée. La méthode qui sera exécutée par l'action en
-        question devra recréer une action différée devant s'exécuter 60
-        secondes plus tard.
+        une action périodique (voir ajouter_action_periodique). Le module
+        diffact la replace dans sa file après chaque exécution, sans
+        dériver : les exécutions ont lieu toutes les 60 secondes, quel que
+        soit leur retard. Il est inutile (et déconseillé) de recréer une
+        action différée depuis la méthode exécutée.
     
     Concrètement, une action différée possède une référence vers
     une fonction ou méthode, et une liste de paramètres. Un temps d'échéance,
@@ -64,6 +74,22 @@ class Diffact(Module):
     d'échéance. Si une action est arrivée à son terme, on exécute la fonction
     en lui passant ses paramètres. On la supprime bien entendu de la liste
     des actions en attente.
+
+    Les actions en attente sont rangées dans une file d'attente triée par
+    temps d'échéance : à chaque tour, on ne consulte que les actions
+    arrivées à échéance, quel que soit le nombre d'actions en attente.
+    Retirer une action se contente de la marquer comme annulée : elle est
+    ignorée quand elle sort de la file. Deux files sont disponibles,
+    au choix dans la configuration du module :
+    -   le tas (voir primaires/diffact/file_tas.py), par défaut : une
+        action est exécutée dès son échéance passée, l'ajout est en
+        O(log n)
+    -   la roue temporelle hiérarchique (voir
+        primaires/diffact/roue_hierarchique.py) : l'ajout et le retrait
+        sont en O(1), mais une action est exécutée au plus 'resolution'
+        secondes après son échéance. Elle convient aux centaines de
+        milliers d'actions de courte durée (tours de combat, régénération,
+        durée des sorts...)
     
     Les actions différées étant contrôlées à chaque tour de boucle synchro,
     il faut prévoir un retard d'exécution maximum à peu près équivalent au
@@ -74,6 +100,7 @@ class Diffact(Module):
         """Constructeur du module"""
         Module.__init__(self, importeur, parser_cmd, "diffact", "primaire")
         self.actions = {} # {nom_action:action_differee}
+        self.file = FileTas() # remplacée à l'initialisation si besoin
         self.logger = None
     
     def config(self):
@@ -84,6 +111,35 @@ class Diffact(Module):
         self.logger = self.importeur.log.creer_logger("diffact", "diffact")
         Module.config(self)
 
+    def init(self):
+        """Initialisation du module.
+        On charge la configuration (tous les modules sont alors configurés)
+        et on choisit la file d'attente. Les actions ajoutées avant
+        l'initialisation y sont reportées.
+
+        """
+        config = self.importeur.anaconf.charger_config("diffact.cfg", {
+            # File d'attente des actions : 'tas' (précise) ou 'roue'
+            # (roue temporelle hiérarchique, pour un très grand nombre
+            # d'actions)
+            "file": "'tas'",
+            # Durée d'un tic (en secondes) de la roue temporelle : une
+            # action est exécutée au plus 'resolution' secondes après son
+            # échéance
+            "resolution": 0.1,
+        })
+        nom_file = config.file
+        if nom_file not in FILES:
+            raise ValueError("la file d'attente {0} n'existe pas".format( \
+                    nom_file))
+
+        if nom_file == "roue":
+            self.file = RoueHierarchique(time.time(), config.resolution)
+            for action in self.actions.values():
+                self.file.ajouter(action)
+
+        Module.init(self)
+
     def boucle(self):
         """Redéfinition de la méthode boucle du Module.
         Cette méthode est appelée pour chaque module, à chaque tour de boucle
@@ -102,13 +158,48 @@ class Diffact(Module):
         -   les paramètres nommés organisés dans un dictionnaire
         
         """
-        if nom_action in self.actions.keys():
-            self.logger.warning("l'action différée {0} existe déjà. " \
-                    "L'ancienne sera écrasée".format(nom_action))
         action = ActionDifferee(nom_action, tps, ref_fonc, *args, **kwargs)
-        self.actions[nom_action] = action
+        self.enregistrer_action(action)
         self.logger.debug("Ajout de l'action {0} exécutée dans {1}s".format( \
                 nom_action, tps))
+
+    def ajouter_action_periodique(self, nom_action, periode, ref_fonc, \
+            *args, phase=None, gigue=0, rattrapage=False, \
+            nb_max_rattrapage=5, **kwargs):
+        """Cette méthode permet d'ajouter une action périodique, exécutée
+        toutes les periode secondes jusqu'à ce qu'elle soit retirée (voir
+        retirer_action). On précise :
+        -   le nom de l'action (nom unique, servant d'identifiant)
+        -   la période en secondes
+        -   la référence vers la fonction ou la méthode à exécuter
+        -   les paramètres non nommés organisés en tuple
+        -   les paramètres nommés organisés dans un dictionnaire
+        Les paramètres phase, gigue, rattrapage et nb_max_rattrapage sont
+        décrits dans primaires/diffact/action_periodique.py. Ils ne
+        peuvent donc pas être transmis à la fonction.
+
+        On retourne l'action créée.
+
+        """
+        action = ActionPeriodique(nom_action, periode, ref_fonc, *args, \
+                phase=phase, gigue=gigue, rattrapage=rattrapage, \
+                nb_max_rattrapage=nb_max_rattrapage, **kwargs)
+        self.enregistrer_action(action)
+        self.logger.debug("Ajout de l'action {0} exécutée toutes les " \
+                "{1}s".format(nom_action, periode))
+        return action
+
+    def enregistrer_action(self, action):
+        """Place l'action dans la liste des actions en attente et dans la
+        file. Si une action de même nom existe, elle est écrasée.
+
+        """
+        if action.nom in self.actions.keys():
+            self.logger.warning("l'action différée {0} existe déjà. " \
+                    "L'ancienne sera écrasée".format(action.nom))
+            self.file.annuler(self.actions[action.nom])
+        self.actions[action.nom] = action
+        self.file.ajouter(action)
     
     def retirer_action(self, nom):
         """Méthode permettant de retirer une action différée de la liste de
@@ -119,19 +210,38 @@ class Diffact(Module):
             self.logger.warning("L'action différée {0} devant être " \
                     "supprimée n'existe pas".format(nom))
         else:
-            del self.actions[nom]
+            self.file.annuler(self.actions.pop(nom))
             self.logger.debug("L'action {0} a bien été supprimée".format(nom))
 
+    def prochaine_echeance(self):
+        """Retourne le temps d'échéance (timestamp) de la prochaine action
+        à exécuter, ou None si aucune action n'est en attente.
+
+        Note: les actions ne sont exécutées qu'aux tours de boucle
+        synchro, cadencés à fréquence fixe par l'ordonnanceur (voir
+        bases/ordonnanceur.py). Une action est donc exécutée au plus une
+        période de tour après son échéance.
+        
+        """
+        return self.file.prochaine_echeance()
+
     def mettre_a_jour_actions(self):
         """Cette méthode se charge de mettre à jour les actions différées en
-        attente d'être exécutées. Elle parcourt la liste des actions en
-        attente et exécute celle qui doivent l'être, tout en les supprimant
-        de la liste.
+        attente d'être exécutées. Elle retire de la file, une à une, les
+        actions arrivées à échéance et les exécute dans l'ordre de leur
+        échéance.
+
+        Les actions périodiques sont replacées dans la file avant leur
+        exécution. Comme les actions ajoutées pendant l'exécution, elles
+        ne seront exécutées, au plus tôt, qu'au tour suivant.
         
         """
-        for nom,action in tuple(self.actions.items()):
-            if action.doit_exec():
-                # On la supprime avant toute chose
-                self.retirer_action(nom)
-                # On l'exécute ensuite
-                action.executer()
+        maintenant = time.time()
+        for action in self.file.extraire(maintenant):
+            # On la replace ou on la supprime avant toute chose
+            if action.reprogrammer(maintenant):
+                self.file.ajouter(action)
+            else:
+                del self.actions[action.nom]
+            # On l'exécute ensuite
+            action.executer()
@@ -43,6 +43,8 @@ class ActionDifferee:
     -   un temps d'échéance sous la forme d'un timestamp (float)
     -   une fonction telle que décrite dans bases.fonction avec une liste
         d'arguments
+    -   un indicateur d'annulation : une action retirée reste dans la file
+        du module diffact jusqu'à son échéance, mais n'est pas exécutée
     
     """
     def __init__(self, nom, tps, ref_fonc, *args, **kwargs):
@@ -50,11 +52,24 @@ class ActionDifferee:
         self.nom = nom
         self.echeance = time.time() + tps
         self.fonction = Fonction(ref_fonc, *args, **kwargs)
+        self.annulee = False
     
     def doit_exec(self):
         """Return True si le temps d'échéance est passé, False sinon."""
         return time.time() >= self.echeance
 
+    def reprogrammer(self, maintenant):
+        """Méthode appelée par le module diffact quand l'action arrive à
+        échéance, juste avant son exécution. On retourne True si l'action
+        doit être replacée dans la file, False sinon.
+
+        Une action différée ne s'exécute qu'une fois : voir
+        primaires/diffact/action_periodique.py pour les actions qui se
+        répètent.
+
+        """
+        return False
+
     def executer(self):
         """Exécution de la fonction. On redirige simplement vers
         self.fonction.exec().
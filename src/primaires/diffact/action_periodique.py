@@ -0,0 +1,110 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""Ce fichier définit la classe ActionPeriodique, détaillée plus bas."""
+
+import time
+import random
+
+from primaires.diffact.action_differee import ActionDifferee
+
+class ActionPeriodique(ActionDifferee):
+    """Cette classe définit une action différée qui se répète à intervalle
+    fixe. Après chaque exécution, le module diffact replace la même action
+    dans sa file : il n'en crée pas de nouvelle.
+
+    La prochaine échéance est calculée à partir de l'échéance précédente,
+    et non de la date d'exécution : le retard d'une exécution ne décale
+    pas les suivantes. En plus d'une action différée, une action
+    périodique contient :
+    -   la période (en secondes)
+    -   la politique de rattrapage : si des échéances ont été manquées
+        (boucle synchro bloquée par exemple), elles sont rattrapées (une
+        par tour de boucle synchro, dans la limite de nb_max_rattrapage)
+        ou sautées
+    -   des statistiques : le nombre d'exécutions, le nombre d'échéances
+        sautées et le retard de la dernière exécution
+
+    La première échéance peut être alignée sur la période (phase) et
+    décalée d'une durée aléatoire (gigue) : des actions de même période
+    créées au même moment ne s'exécutent alors pas toutes au même tour.
+
+    """
+    def __init__(self, nom, periode, ref_fonc, *args, phase=None, gigue=0, \
+            rattrapage=False, nb_max_rattrapage=5, **kwargs):
+        """Constructeur de l'action périodique.
+        -   periode : l'intervalle (en secondes) entre deux exécutions
+        -   phase : si None, la première exécution a lieu dans periode
+            secondes. Sinon, elle a lieu au prochain timestamp égal à
+            phase modulo periode (phase=0 aligne l'action sur la période)
+        -   gigue : la durée maximum (en secondes) du décalage aléatoire
+            de la première échéance, et donc de toutes les suivantes
+        -   rattrapage : True pour rattraper les échéances manquées, False
+            pour les sauter
+        -   nb_max_rattrapage : le nombre maximum d'échéances rattrapées,
+            les suivantes sont sautées
+
+        """
+        if periode <= 0:
+            raise ValueError("la période d'une action périodique doit " \
+                    "être positive ({0})".format(periode))
+
+        ActionDifferee.__init__(self, nom, periode, ref_fonc, *args, **kwargs)
+        self.periode = periode
+        self.rattrapage = rattrapage
+        self.nb_max_rattrapage = nb_max_rattrapage
+        if phase is not None:
+            maintenant = time.time()
+            self.echeance = maintenant + (phase - maintenant) % periode
+        if gigue > 0:
+            self.echeance += random.uniform(0, gigue)
+
+        # Statistiques
+        self.nb_executions = 0
+        self.nb_sautees = 0
+        self.retard = 0
+
+    def reprogrammer(self, maintenant):
+        """Calcule la prochaine échéance de l'action, qui vient d'arriver
+        à échéance. On retourne True : l'action doit être replacée dans
+        la file.
+
+        """
+        self.nb_executions += 1
+        self.retard = maintenant - self.echeance
+        self.echeance += self.periode
+        if self.echeance <= maintenant:
+            # Nombre d'échéances manquées
+            manquees = int((maintenant - self.echeance) / self.periode) + 1
+            if self.rattrapage:
+                manquees = max(0, manquees - self.nb_max_rattrapage)
+            self.echeance += manquees * self.periode
+            self.nb_sautees += manquees
+
+        return True
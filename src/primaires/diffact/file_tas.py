@@ -0,0 +1,100 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""Ce fichier définit la classe FileTas, détaillée plus bas."""
+
+import heapq
+
+class FileTas:
+    """Cette classe range les actions différées dans un tas (voir le
+    module heapq) trié par temps d'échéance.
+
+    Ajouter une action est en O(log n). La retirer se contente de la
+    marquer comme annulée, en O(1) : elle est ignorée quand elle sort du
+    tas. Le tas est reconstruit quand les actions annulées y sont plus
+    nombreuses que les actions en attente.
+
+    La précision est celle de l'horloge : une action est exécutée dès
+    que son temps d'échéance est passé.
+
+    """
+    def __init__(self):
+        """Constructeur de la file, vide."""
+        self.tas = [] # tas de (échéance, numéro, action_differee)
+        self.numero = 0 # départage les actions de même échéance
+        self.nb_annulees = 0 # nombre d'actions annulées dans le tas
+
+    def __len__(self):
+        return len(self.tas) - self.nb_annulees
+
+    def ajouter(self, action):
+        """Ajoute l'action à la file."""
+        self.numero += 1
+        heapq.heappush(self.tas, (action.echeance, self.numero, action))
+
+    def annuler(self, action):
+        """Marque l'action comme annulée : elle reste dans le tas mais
+        ne sera pas exécutée.
+
+        """
+        action.annulee = True
+        self.nb_annulees += 1
+        # On évite de reconstruire un petit tas trop souvent
+        if self.nb_annulees > len(self.tas) // 2 and self.nb_annulees > 64:
+            self.tas = [entree for entree in self.tas \
+                    if not entree[2].annulee]
+            heapq.heapify(self.tas)
+            self.nb_annulees = 0
+
+    def prochaine_echeance(self):
+        """Retourne le temps d'échéance de la prochaine action, ou None
+        si la file est vide.
+
+        """
+        tas = self.tas
+        while tas and tas[0][2].annulee:
+            heapq.heappop(tas)
+            self.nb_annulees -= 1
+
+        return tas[0][0] if tas else None
+
+    def extraire(self, maintenant):
+        """Retire de la file, une à une, les actions dont le temps
+        d'échéance est passé, dans l'ordre de leur échéance (générateur).
+        Les actions ajoutées pendant l'extraction ne sont pas concernées.
+
+        """
+        limite = self.numero
+        while self.tas and self.tas[0][0] <= maintenant and \
+                self.tas[0][1] <= limite:
+            action = heapq.heappop(self.tas)[2]
+            if action.annulee:
+                self.nb_annulees -= 1
+            else:
+                yield action
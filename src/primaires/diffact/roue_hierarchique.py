@@ -0,0 +1,216 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""Ce fichier définit la classe RoueHierarchique, détaillée plus bas."""
+
+class RoueHierarchique:
+    """Cette classe range les actions différées dans une roue temporelle
+    hiérarchique (hierarchical timing wheel).
+
+    Le temps est découpé en tics de 'resolution' secondes. La roue est
+    composée de 'nb_niveaux' niveaux de 2 ** bits cases. Une case du
+    niveau 0 correspond à un tic, une case du niveau 1 à 2 ** bits tics,
+    une case du niveau 2 à 2 ** (2 * bits) tics, et ainsi de suite. Une
+    action est placée dans le niveau le plus bas pouvant contenir son
+    échéance. Quand le temps atteint une case d'un niveau supérieur, ses
+    actions descendent d'un ou plusieurs niveaux (cascade) : elles
+    arrivent ainsi au niveau 0 le tic de leur échéance.
+
+    Ajouter et retirer une action sont donc en O(1) (une action retirée
+    est seulement marquée comme annulée, elle est éliminée quand sa case
+    est parcourue), et chaque action descend au plus nb_niveaux fois.
+    En contrepartie, la précision est celle du tic : une action est
+    exécutée au plus 'resolution' secondes après son temps d'échéance.
+
+    Les actions dont l'échéance dépasse la capacité de la roue (2 **
+    (bits * nb_niveaux) tics) attendent dans une liste à part, examinée
+    à chaque tour complet du dernier niveau.
+
+    """
+    def __init__(self, maintenant, resolution=0.1, nb_niveaux=4, bits=6):
+        """Constructeur de la roue, vide, qui commence au temps
+        maintenant.
+
+        """
+        self.resolution = resolution
+        self.nb_niveaux = nb_niveaux
+        self.bits = bits
+        self.masque = (1 << bits) - 1
+        self.niveaux = [[[] for i in range(1 << bits)] \
+                for niveau in range(nb_niveaux)]
+        self.lointaines = [] # actions au-delà du dernier niveau
+        self.tic = int(maintenant / resolution) # premier tic non écoulé
+        self.plancher = self.tic # premier tic accepté par ajouter
+        self.nb_actions = 0 # nombre d'actions dans la roue
+        self.nb_annulees = 0 # nombre d'actions annulées dans la roue
+
+    def __len__(self):
+        return self.nb_actions - self.nb_annulees
+
+    def ajouter(self, action):
+        """Ajoute l'action à la roue."""
+        tic = max(int(action.echeance / self.resolution), self.plancher)
+        self.placer(tic, action)
+        self.nb_actions += 1
+
+    def placer(self, tic, action):
+        """Place l'action dans la case du niveau correspondant au tic
+        précisé.
+
+        """
+        # Le niveau est celui du bit de poids fort de l'écart
+        niveau = (max(tic - self.tic, 1).bit_length() - 1) // self.bits
+        if niveau < self.nb_niveaux:
+            indice = (tic >> (self.bits * niveau)) & self.masque
+            self.niveaux[niveau][indice].append((tic, action))
+        else:
+            self.lointaines.append((tic, action))
+
+    def annuler(self, action):
+        """Marque l'action comme annulée : elle reste dans la roue mais
+        ne sera pas exécutée.
+
+        """
+        action.annulee = True
+        self.nb_annulees += 1
+
+    def cascader(self, niveau):
+        """Fait descendre les actions de la case courante du niveau
+        précisé. Les actions annulées sont éliminées.
+
+        """
+        cases = self.niveaux[niveau]
+        indice = (self.tic >> (self.bits * niveau)) & self.masque
+        case = cases[indice]
+        cases[indice] = []
+        for tic, action in case:
+            if action.annulee:
+                self.nb_actions -= 1
+                self.nb_annulees -= 1
+            else:
+                self.placer(tic, action)
+
+    def replacer_lointaines(self):
+        """Replace dans la roue les actions lointaines qu'elle peut
+        maintenant contenir.
+
+        """
+        lointaines = self.lointaines
+        self.lointaines = []
+        for tic, action in lointaines:
+            if action.annulee:
+                self.nb_actions -= 1
+                self.nb_annulees -= 1
+            else:
+                self.placer(tic, action)
+
+    def prochaine_echeance(self):
+        """Retourne le temps d'échéance de la prochaine action, ou None
+        si la roue est vide. La prochaine action est celle du plus petit
+        tic (à tic égal, celle de plus petite échéance).
+
+        On cherche, pour chaque niveau, la première case (dans l'ordre du
+        temps) contenant une action en attente. Une case ne contient pas
+        d'action d'un tic antérieur au début de la période qu'elle couvre :
+        on ne la parcourt entièrement que si elle peut contenir une action
+        plus proche que la meilleure trouvée. Le coût dépend donc du nombre
+        de cases, et non du nombre d'actions.
+
+        """
+        if len(self) == 0:
+            return None
+
+        meilleure = None # (tic, échéance)
+        bits = self.bits
+        for niveau, cases in enumerate(self.niveaux):
+            decalage = bits * niveau
+            bloc = self.tic >> decalage
+            # Aux niveaux supérieurs, la case courante a déjà cascadé (elle
+            # ne contient que des actions du tour suivant), sauf si le
+            # tic courant est celui de sa cascade
+            if niveau > 0 and self.tic & ((1 << decalage) - 1):
+                bloc += 1
+            for i in range(self.masque + 1):
+                if meilleure is not None and \
+                        (bloc + i) << decalage > meilleure[0]:
+                    break
+                case = cases[(bloc + i) & self.masque]
+                if any(not action.annulee for tic, action in case):
+                    candidate = min((tic, action.echeance) for tic, action \
+                            in case if not action.annulee)
+                    if meilleure is None or candidate < meilleure:
+                        meilleure = candidate
+                    break
+
+        for tic, action in self.lointaines:
+            if not action.annulee and (meilleure is None or \
+                    (tic, action.echeance) < meilleure):
+                meilleure = (tic, action.echeance)
+
+        return meilleure[1]
+
+    def extraire(self, maintenant):
+        """Fait avancer la roue jusqu'au temps maintenant et retire, une à
+        une, les actions des tics écoulés, dans l'ordre des tics
+        (générateur). Les actions ajoutées pendant l'extraction sont
+        placées au-delà du dernier tic écoulé.
+
+        """
+        cible = int(maintenant / self.resolution)
+        if cible <= self.tic:
+            return
+
+        self.plancher = cible
+        bits = self.bits
+        niveau_0 = self.niveaux[0]
+        while self.tic < cible:
+            if self.nb_actions == 0:
+                self.tic = cible
+                break
+
+            tic = self.tic
+            if tic & self.masque == 0:
+                # On cascade du niveau le plus haut au plus bas
+                if tic >> (bits * self.nb_niveaux) << \
+                        (bits * self.nb_niveaux) == tic and self.lointaines:
+                    self.replacer_lointaines()
+                for niveau in range(self.nb_niveaux - 1, 0, -1):
+                    if tic & ((1 << (bits * niveau)) - 1) == 0:
+                        self.cascader(niveau)
+
+            indice = tic & self.masque
+            case = niveau_0[indice]
+            niveau_0[indice] = []
+            self.tic = tic + 1
+            for tic_action, action in case:
+                self.nb_actions -= 1
+                if action.annulee:
+                    self.nb_annulees -= 1
+                else:
+                    yield action
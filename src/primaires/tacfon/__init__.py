@@ -0,0 +1,233 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""Fichier contenant la classe Tacfon définissant le module primaire
+du même nom.
+
+"""
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from abstraits.module import *
+from bases.histogramme import Histogramme
+from primaires.tacfon.tache import Tache
+
+class Tacfon(Module):
+    """Cette classe contient les informations du module primaire tacfon.
+    Ce module permet d'exécuter des tâches bloquantes en arrière-plan.
+
+    La boucle synchro ne tourne que dans un seul thread : une fonction
+    bloquante (parcours du disque, résolution DNS inverse, sérialisation
+    d'un gros volume de données...) la paralyse, et avec elle l'ensemble
+    du MUD. Ce module confie ces fonctions à un groupe de threads
+    (voir concurrent.futures.ThreadPoolExecutor).
+
+    Pour garantir que l'état du MUD n'est modifié que depuis la boucle
+    synchro, le résultat d'une tâche n'est pas traité dans le thread qui
+    l'a calculé : une fois la fonction terminée, la tâche est placée dans
+    une file des tâches terminées. A chaque tour de boucle synchro, le
+    module vide cette file et appelle la fonction de fin de chaque tâche
+    (voir primaires/tacfon/tache.py).
+
+    Exemple :
+    >>> def resoudre(adresse):
+    ...     return socket.gethostbyaddr(adresse)[0]
+    >>> def afficher(client, tache):
+    ...     if tache.erreur is None:
+    ...         client.envoyer(client.encoder("Hôte : {0}".format(
+    ...                 tache.resultat)))
+    >>> importeur.tacfon.ajouter_tache(Fonction(afficher, client),
+    ...         resoudre, "127.0.0.1")
+
+    Le nombre de tâches en attente ou en cours est limité (voir la
+    configuration du module) : au-delà, les nouvelles tâches sont
+    refusées. Une tâche peut être annulée : si elle n'a pas commencé,
+    elle ne sera jamais exécutée, sinon son résultat est ignoré (on ne
+    peut pas interrompre un thread).
+
+    """
+    def __init__(self, importeur, parser_cmd):
+        """Constructeur du module"""
+        Module.__init__(self, importeur, parser_cmd, "tacfon", "primaire")
+        self.logger = None
+        self.executeur = None
+        self.nb_threads = 4
+        self.taille_max_file = 256
+        self.id_courant = 0
+        self.taches = {} # {id_tache:tache} en attente ou en cours
+        self.terminees = queue.SimpleQueue()
+
+        # Statistiques
+        self.nb_terminees = 0
+        self.nb_erreurs = 0
+        self.nb_annulees = 0
+        self.nb_refusees = 0
+        self.histogramme_attente = Histogramme()
+        self.histogramme_duree = Histogramme()
+
+    def config(self):
+        """Redéfinition de la configuration du module.
+        On créée un logger portant le nom du module.
+
+        """
+        self.logger = self.importeur.log.creer_logger("tacfon", "tacfon")
+        Module.config(self)
+
+    def init(self):
+        """Initialisation du module.
+        On charge la configuration (tous les modules sont alors configurés)
+        et on créée le groupe de threads.
+
+        """
+        config = self.importeur.anaconf.charger_config("tacfon.cfg", {
+            # Nombre de threads exécutant les tâches
+            "nb_threads": 4,
+            # Nombre maximum de tâches en attente ou en cours, au-delà
+            # duquel les nouvelles tâches sont refusées (-1 : aucune limite)
+            "taille_max_file": 256,
+        })
+        self.nb_threads = config.nb_threads
+        self.taille_max_file = config.taille_max_file
+        self.executeur = ThreadPoolExecutor(max_workers=self.nb_threads, \
+                thread_name_prefix="tacfon")
+        Module.init(self)
+
+    def detruire(self):
+        """Destruction du module.
+        Les tâches qui n'ont pas commencé sont annulées, on n'attend pas
+        la fin de celles en cours.
+
+        """
+        if self.executeur is not None:
+            self.executeur.shutdown(wait=False, cancel_futures=True)
+            self.executeur = None
+
+        Module.detruire(self)
+
+    def boucle(self):
+        """Redéfinition de la méthode boucle du Module.
+        On traite les tâches terminées.
+
+        """
+        self.traiter_terminees()
+
+    def ajouter_tache(self, fin, ref_fonc, *args, **kwargs):
+        """Cette méthode permet de confier une tâche au groupe de threads.
+        On précise :
+        -   la fonction de fin (un objet Fonction, ou None), appelée
+            depuis la boucle synchro avec la tâche en paramètre
+        -   la référence vers la fonction ou la méthode à exécuter dans
+            un thread secondaire
+        -   les paramètres non nommés organisés en tuple
+        -   les paramètres nommés organisés dans un dictionnaire
+
+        On retourne la tâche créée, ou None si elle a été refusée.
+
+        """
+        if self.executeur is None:
+            self.logger.warning("Le module tacfon n'est pas initialisé, " \
+                    "la tâche {0} est refusée".format(ref_fonc))
+            self.nb_refusees += 1
+            return None
+
+        if self.taille_max_file >= 0 and \
+                len(self.taches) >= self.taille_max_file:
+            self.logger.warning("{0} tâches en attente, la tâche {1} " \
+                    "est refusée".format(len(self.taches), ref_fonc))
+            self.nb_refusees += 1
+            return None
+
+        self.id_courant += 1
+        tache = Tache(self.id_courant, fin, ref_fonc, *args, **kwargs)
+        self.taches[tache.id] = tache
+        tache.future = self.executeur.submit(self.executer_tache, tache)
+        return tache
+
+    def annuler_tache(self, tache):
+        """Annule la tâche passée en paramètre.
+        Si elle n'a pas commencé, elle ne sera pas exécutée. Sinon, son
+        résultat sera ignoré et sa fonction de fin ne sera pas appelée.
+
+        """
+        if tache.id not in self.taches or tache.annulee:
+            return
+
+        tache.annulee = True
+        self.nb_annulees += 1
+        if tache.future.cancel():
+            del self.taches[tache.id]
+
+    def executer_tache(self, tache):
+        """Exécute la tâche passée en paramètre.
+        Cette méthode est appelée dans un thread secondaire.
+
+        """
+        if not tache.annulee:
+            tache.executer()
+
+        self.terminees.put(tache)
+
+    def traiter_terminees(self):
+        """Traite les tâches terminées.
+        Pour chaque tâche, on met à jour les statistiques, puis on appelle
+        sa fonction de fin, sauf si elle a été annulée.
+
+        """
+        while True:
+            try:
+                tache = self.terminees.get_nowait()
+            except queue.Empty:
+                break
+
+            self.taches.pop(tache.id, None)
+            if tache.annulee:
+                continue
+
+            self.nb_terminees += 1
+            self.histogramme_attente.ajouter(tache.attente)
+            self.histogramme_duree.ajouter(tache.duree)
+            if tache.erreur is not None:
+                self.nb_erreurs += 1
+                self.logger.warning("La tâche {0} ({1}) a levé " \
+                        "l'exception {2!r}".format(tache.id, \
+                        tache.fonction.fonction, tache.erreur))
+
+            tache.terminer()
+
+    def stats(self):
+        """Retourne les statistiques du module (str)."""
+        return "{0} tâche(s) en cours, {1} terminée(s) dont {2} en " \
+                "erreur, {3} annulée(s), {4} refusée(s), attente " \
+                "moyenne {5:.1f}ms, durée moyenne {6:.1f}ms, 99e " \
+                "percentile {7:.1f}ms".format(len(self.taches), \
+                self.nb_terminees, self.nb_erreurs, self.nb_annulees, \
+                self.nb_refusees, self.histogramme_attente.moyenne * 1000, \
+                self.histogramme_duree.moyenne * 1000, \
+                self.histogramme_duree.percentile(0.99) * 1000)
@@ -0,0 +1,123 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""Ce fichier définit la classe Tache, détaillée plus bas."""
+
+import time
+
+from bases.fonction import Fonction
+
+class Tache:
+    """Cette classe représente une tâche confiée au module tacfon.
+
+    Une tâche est une fonction bloquante (parcours du disque, résolution
+    DNS inverse, sérialisation coûteuse...) exécutée dans un thread
+    secondaire. Une fois la fonction terminée, la fonction de fin
+    (un objet Fonction, voir bases/fonction.py) est appelée depuis la
+    boucle synchro, en lui passant la tâche en paramètre. C'est donc dans
+    la fonction de fin, et seulement là, que l'on peut modifier l'état
+    du MUD.
+
+    Une tâche contient :
+    -   un identifiant unique (int)
+    -   la fonction à exécuter dans le thread (un objet Fonction)
+    -   la fonction de fin (un objet Fonction ou None)
+    -   le résultat de la fonction, ou l'exception levée (erreur)
+    -   les dates de soumission, de début et de fin d'exécution
+
+    """
+    def __init__(self, id, fin, ref_fonc, *args, **kwargs):
+        """Constructeur de la tâche."""
+        self.id = id
+        self.fonction = Fonction(ref_fonc, *args, **kwargs)
+        self.fin = fin
+        self.future = None
+        self.resultat = None
+        self.erreur = None
+        self.annulee = False
+        self.date_soumission = time.monotonic()
+        self.date_debut = None
+        self.date_fin = None
+
+    def __repr__(self):
+        """Retourne l'identifiant et l'état de la tâche."""
+        if self.annulee:
+            etat = "annulée"
+        elif self.date_fin is not None:
+            etat = "terminée"
+        elif self.date_debut is not None:
+            etat = "en cours"
+        else:
+            etat = "en attente"
+
+        return "<tâche {0} {1}>".format(self.id, etat)
+
+    def _get_attente(self):
+        """Retourne le temps (en secondes) passé dans la file d'attente,
+        ou None si la tâche n'a pas commencé.
+
+        """
+        if self.date_debut is None:
+            return None
+
+        return self.date_debut - self.date_soumission
+
+    def _get_duree(self):
+        """Retourne la durée d'exécution (en secondes) de la fonction,
+        ou None si elle n'est pas terminée.
+
+        """
+        if self.date_fin is None:
+            return None
+
+        return self.date_fin - self.date_debut
+
+    attente = property(_get_attente)
+    duree = property(_get_duree)
+
+    def executer(self):
+        """Exécute la fonction de la tâche.
+        Cette méthode est appelée dans un thread secondaire : elle ne doit
+        toucher qu'aux attributs de la tâche.
+
+        """
+        self.date_debut = time.monotonic()
+        try:
+            fonction = self.fonction
+            self.resultat = fonction.fonction(*fonction.args, \
+                    **fonction.kwargs)
+        except Exception as err:
+            self.erreur = err
+        finally:
+            self.date_fin = time.monotonic()
+
+    def terminer(self):
+        """Appelle la fonction de fin, depuis la boucle synchro."""
+        if self.fin is not None:
+            self.fin.executer(self)
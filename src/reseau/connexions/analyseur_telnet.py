@@ -0,0 +1,310 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce fichier définit la classe AnalyseurTelnet, détaillée plus bas.
+
+Il contient aussi les constantes du protocole telnet (commandes et options)
+utilisées par le projet.
+
+"""
+
+from bases.fonction import Fonction
+
+# Commandes telnet
+SE = 240 # fin de sous-négociation
+NOP = 241
+GA = 249 # go ahead
+SB = 250 # début de sous-négociation
+WILL = 251
+WONT = 252
+DO = 253
+DONT = 254
+IAC = 255 # interpret as command
+
+# Options telnet
+ECHO = 1
+SGA = 3 # suppress go ahead
+TTYPE = 24 # type de terminal
+NAWS = 31 # taille de la fenêtre du client
+CHARSET = 42
+COMPRESS2 = 86 # MCCP v2
+
+# Sous-négociation de l'option CHARSET (RFC 2066)
+CHARSET_REQUEST = 1
+CHARSET_ACCEPTED = 2
+CHARSET_REJECTED = 3
+
+# Taille maximum d'une sous-négociation (au-delà, elle est tronquée)
+TAILLE_MAX_SOUS_NEGO = 1024
+
+# Etats de l'analyseur
+DONNEES = 0 # données ordinaires
+COMMANDE = 1 # on a reçu IAC, on attend la commande
+OPTION = 2 # on a reçu IAC WILL/WONT/DO/DONT, on attend l'option
+SB_OPTION = 3 # on a reçu IAC SB, on attend l'option
+SOUS_NEGO = 4 # on reçoit les données de la sous-négociation
+SOUS_NEGO_IAC = 5 # on a reçu IAC pendant la sous-négociation
+
+# Table des négociations
+# Pour chaque commande reçue, on précise :
+# -   la commande qui y répond (si on l'a envoyée, on attendait cette réponse)
+# -   le côté concerné : "distant" (le client) ou "local" (le serveur)
+# -   si la commande active (True) ou désactive (False) l'option
+# -   la réponse en cas d'accord
+# -   la réponse en cas de refus
+NEGOCIATIONS = {
+    WILL: (DO, "distant", True, DO, DONT),
+    WONT: (DO, "distant", False, DONT, DONT),
+    DO: (WILL, "local", True, WILL, WONT),
+    DONT: (WILL, "local", False, WONT, WONT),
+}
+
+class AnalyseurTelnet:
+    """Cette classe définit un analyseur du protocole telnet, propre à
+    un client connecté.
+
+    Les octets reçus du client lui sont transmis au fur et à mesure
+    (méthode analyser). Il en retire les séquences telnet (commandes,
+    négociations d'options, sous-négociations) et retourne les données
+    ordinaires, seules transmises au découpage en lignes.
+
+    L'analyseur est une machine à états : une séquence peut être coupée
+    entre deux réceptions, il reprendra là où il s'était arrêté. Les données
+    ne contenant aucune séquence telnet sont retournées telles quelles.
+
+    Les options sont négociées selon deux tables :
+    -   les options acceptées, pour chaque côté (le client ou le serveur).
+        Une option non acceptée est refusée
+    -   les fonctions (objets Fonction) appelées quand une option est
+        activée ou désactivée (paramètres : le client, la commande reçue)
+        ou quand une sous-négociation est reçue (paramètres : le client,
+        les données de la sous-négociation)
+    Voir la méthode accepter.
+
+    """
+    def __init__(self, client):
+        """Constructeur de l'analyseur.
+        On précise en paramètre le client auquel envoyer les réponses.
+
+        """
+        self.client = client
+        self.etat = DONNEES
+        self.commande = None # commande en cours de négociation
+        self.option = None # option en cours de sous-négociation
+        self.sous_nego = bytearray()
+
+        # Options acceptées et actives, pour chaque côté
+        self.acceptees = {"local": set(), "distant": set()}
+        self.actives = {"local": set(), "distant": set()}
+
+        # Demandes envoyées au client, en attente de réponse
+        # Ce sont des tuples (commande, option)
+        self.demandes = set()
+
+        # Fonctions appelées lors des négociations {option:Fonction}
+        self.negociations = {}
+
+        # Fonctions appelées lors des sous-négociations {option:Fonction}
+        self.sous_negociations = {}
+
+    def accepter(self, option, local=False, negociation=None, \
+            sous_negociation=None):
+        """Accepte une option.
+        -   option : l'option (entier) à accepter
+        -   local : True si l'option est activée côté serveur (le client
+            envoie DO), False si elle l'est côté client (le client envoie
+            WILL)
+        -   negociation : fonction appelée quand l'option est activée ou
+            désactivée
+        -   sous_negociation : fonction appelée à la réception d'une
+            sous-négociation de l'option
+
+        Les fonctions peuvent être des objets Fonction ou de simples
+        fonctions.
+
+        """
+        self.acceptees["local" if local else "distant"].add(option)
+        if negociation is not None:
+            if not isinstance(negociation, Fonction):
+                negociation = Fonction(negociation)
+            self.negociations[option] = negociation
+        if sous_negociation is not None:
+            if not isinstance(sous_negociation, Fonction):
+                sous_negociation = Fonction(sous_negociation)
+            self.sous_negociations[option] = sous_negociation
+
+    def est_active(self, option, local=False):
+        """Retourne True si l'option est active, False sinon."""
+        return option in self.actives["local" if local else "distant"]
+
+    def demander(self, commande, option):
+        """Envoie une demande au client (IAC commande option).
+        La réponse du client ne donnera pas lieu à une nouvelle réponse.
+
+        """
+        self.demandes.add((commande, option))
+        self.client.envoyer(bytes((IAC, commande, option)))
+
+    def envoyer_sous_nego(self, option, donnees):
+        """Envoie une sous-négociation au client."""
+        donnees = bytes(donnees).replace(b"\xff", b"\xff\xff")
+        self.client.envoyer(bytes((IAC, SB, option)) + donnees + \
+                bytes((IAC, SE)))
+
+    def analyser(self, donnees):
+        """Analyse les octets reçus et retourne les données ordinaires
+        (bytes ou bytearray).
+
+        Les séquences telnet sont retirées et traitées. Si elles sont
+        incomplètes, leur traitement se poursuivra lors de l'analyse
+        suivante.
+
+        """
+        # Cas le plus courant : aucune séquence en cours, aucune commande
+        if self.etat == DONNEES and IAC not in donnees:
+            return donnees
+
+        sortie = bytearray()
+        i = 0
+        taille = len(donnees)
+        while i < taille:
+            etat = self.etat
+            if etat == DONNEES:
+                # On copie d'un bloc les données jusqu'au prochain IAC
+                fin = donnees.find(IAC, i)
+                if fin < 0:
+                    sortie += donnees[i:]
+                    break
+                sortie += donnees[i:fin]
+                self.etat = COMMANDE
+                i = fin + 1
+            elif etat == SOUS_NEGO:
+                # De même pour les données de la sous-négociation
+                fin = donnees.find(IAC, i)
+                if fin < 0:
+                    fin = taille
+                else:
+                    self.etat = SOUS_NEGO_IAC
+                place = TAILLE_MAX_SOUS_NEGO - len(self.sous_nego)
+                self.sous_nego += donnees[i:min(fin, i + place)]
+                i = fin + 1
+            else:
+                TRANSITIONS[etat](self, donnees[i], sortie)
+                i += 1
+
+        return sortie
+
+    def traiter_commande(self, octet, sortie):
+        """On a reçu IAC suivi de l'octet précisé."""
+        if octet == IAC:
+            # IAC IAC : l'octet 255 dans les données
+            sortie.append(IAC)
+            self.etat = DONNEES
+        elif octet in NEGOCIATIONS:
+            self.commande = octet
+            self.etat = OPTION
+        elif octet == SB:
+            self.etat = SB_OPTION
+        else:
+            # GA, NOP et autres commandes sans option : on les ignore
+            self.etat = DONNEES
+
+    def traiter_option(self, octet, sortie):
+        """On a reçu IAC WILL/WONT/DO/DONT suivi de l'option précisée."""
+        self.etat = DONNEES
+        self.negocier(self.commande, octet)
+
+    def traiter_sb_option(self, octet, sortie):
+        """On a reçu IAC SB suivi de l'option précisée."""
+        self.option = octet
+        self.sous_nego = bytearray()
+        self.etat = SOUS_NEGO
+
+    def traiter_sous_nego_iac(self, octet, sortie):
+        """On a reçu IAC pendant une sous-négociation."""
+        if octet == IAC:
+            # IAC IAC : l'octet 255 dans la sous-négociation
+            if len(self.sous_nego) < TAILLE_MAX_SOUS_NEGO:
+                self.sous_nego.append(IAC)
+            self.etat = SOUS_NEGO
+        else:
+            # IAC SE termine la sous-négociation. Toute autre commande
+            # l'interrompt : on la termine malgré tout
+            self.etat = DONNEES
+            fonction = self.sous_negociations.get(self.option)
+            if fonction is not None:
+                fonction.executer(self.client, bytes(self.sous_nego))
+            self.sous_nego = bytearray()
+            if octet != SE:
+                self.traiter_commande(octet, sortie)
+
+    def negocier(self, commande, option):
+        """Traite une négociation (commande WILL, WONT, DO ou DONT) reçue
+        du client.
+
+        On répond selon la table NEGOCIATIONS, sauf si la commande reçue
+        répond à une de nos demandes. On ne répond pas non plus si l'état
+        de l'option ne change pas, pour éviter les boucles de négociation.
+
+        """
+        demande, cote, activer, accord, refus = NEGOCIATIONS[commande]
+        actives = self.actives[cote]
+        attendue = (demande, option) in self.demandes
+        self.demandes.discard((demande, option))
+        if activer:
+            if option not in self.acceptees[cote]:
+                reponse = refus
+            elif option in actives:
+                return
+            else:
+                actives.add(option)
+                reponse = accord
+        else:
+            if option not in actives:
+                return
+            actives.discard(option)
+            reponse = accord
+
+        if not attendue:
+            self.client.envoyer(bytes((IAC, reponse, option)))
+        if reponse == accord:
+            fonction = self.negociations.get(option)
+            if fonction is not None:
+                fonction.executer(self.client, commande)
+
+# Table des transitions : pour chaque état (hors données), la méthode
+# traitant l'octet reçu
+TRANSITIONS = {
+    COMMANDE: AnalyseurTelnet.traiter_commande,
+    OPTION: AnalyseurTelnet.traiter_option,
+    SB_OPTION: AnalyseurTelnet.traiter_sb_option,
+    SOUS_NEGO_IAC: AnalyseurTelnet.traiter_sous_nego_iac,
+}
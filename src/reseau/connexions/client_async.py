@@ -0,0 +1,120 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce fichier définit la classe ClientConnecteAsync, détaillée plus bas."""
+
+import asyncio
+
+from reseau.connexions.client_connecte import ClientConnecte
+
+class ClientConnecteAsync(ClientConnecte, asyncio.Protocol):
+    """Cette classe représente un client connecté au serveur asynchrone
+    (voir reseau/connexions/serveur_async.py).
+
+    C'est à la fois un ClientConnecte, dont elle reprend les attributs et les
+    méthodes de manipulation du message reçu (get_message, get_message_decode,
+    message_est_complet...), et un protocole asyncio : la boucle asyncio
+    l'informe de la connexion, de la réception de données et de la
+    déconnexion.
+
+    Les fonctions de callback du serveur reçoivent donc un client qui se
+    manipule exactement comme un client du serveur synchrone.
+
+    """
+    def __init__(self, serveur):
+        """Constructeur du protocole.
+
+        Le client n'est véritablement construit qu'à la connexion
+        (méthode connection_made), quand le transport est connu.
+
+        """
+        self.serveur = serveur
+        self.transport = None
+        self.ajoute = False # passe à True quand le serveur accepte le client
+
+    def connection_made(self, transport):
+        """Méthode appelée par asyncio quand la connexion est établie."""
+        self.transport = transport
+        infos = transport.get_extra_info("peername")
+        ClientConnecte.__init__(self, transport.get_extra_info("socket"), infos)
+        self.serveur.ajouter_client(self)
+
+    def data_received(self, donnees):
+        """Méthode appelée par asyncio quand des données sont reçues."""
+        self.ajouter_message(donnees)
+        self.serveur.recevoir_client(self)
+
+    def connection_lost(self, exc):
+        """Méthode appelée par asyncio quand la connexion est perdue."""
+        if self.connecte:
+            self.connecte = False
+            self.retour = "perte de la connexion"
+
+        if self.ajoute:
+            self.serveur.retirer_client(self)
+
+    def recevoir(self):
+        """Les données sont transmises par asyncio (voir data_received),
+        cette méthode n'a donc rien à faire.
+
+        """
+        pass
+
+    def envoyer(self, message):
+        """Envoie d'un message au client.
+        Le message est déjà encodé. Il est confié au transport asyncio
+        qui l'enverra dès que possible.
+
+        Comme pour le serveur synchrone, un client lent accumule du
+        retard dans le tampon du transport : si ce retard dépasse
+        taille_max_sortie octets, le client est déconnecté.
+
+        """
+        if not self.connecte:
+            return
+
+        self.transport.write(message)
+        if self.transport.get_write_buffer_size() > self.taille_max_sortie:
+            self.deconnecter("tampon de sortie saturé", abandonner=True)
+
+    def deconnecter(self, message, abandonner=False):
+        """Méthode appelée pour déconnecter un client.
+        Le transport est fermé une fois les données en attente envoyées,
+        sauf si abandonner est à True : elles sont alors perdues (le
+        client ne les lit de toute façon pas).
+
+        """
+        self.connecte = False
+        self.retour = message
+        if abandonner:
+            self.transport.abort()
+        else:
+            self.transport.close()
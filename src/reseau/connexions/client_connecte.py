@@ -30,7 +30,41 @@
 
 """Ce fichier définit la classe ClientConnecte, détaillée plus bas."""
 
+import re
+import time
+import zlib
+import codecs
 import socket
+import itertools
+import collections
+
+from reseau.connexions.analyseur_telnet import *
+from reseau.connexions.compteurs_envoi import CompteursEnvoi
+from reseau.fonctions.nettoyage import nettoyer
+from bases.fonction import Fonction
+
+# Nombre maximum de messages en attente envoyés en un seul appel système
+NB_MAX_TAMPONS = 256
+
+# On envoie plusieurs messages en un appel si le système le permet
+ENVOI_GROUPE = hasattr(socket.socket, "sendmsg")
+
+# Nombre d'octets lus au maximum à chaque réception
+TAILLE_RECEPTION = 4096
+
+# Encodages proposés au client lors de la négociation telnet CHARSET,
+# par ordre de préférence
+ENCODAGES_PROPOSES = ("UTF-8", "ISO-8859-1")
+
+# Fins de ligne reconnues : \r\n, \n\r, \r\0 (telnet), \r ou \n
+RE_FIN_LIGNE = re.compile(b"\r\n|\n\r|\r\0|\r|\n")
+
+# Si un message se termine par \r ou \n, le caractère complétant la fin
+# de ligne peut arriver avec la réception suivante. On l'ignore alors.
+COMPLEMENTS = {
+    b"\r": b"\n\0",
+    b"\n": b"\r",
+}
 
 class ClientConnecte:
     """Cette classe est une classe envelope d'un socket.
@@ -44,8 +78,29 @@ class ClientConnecte:
     On définit pour chaque connexion instanciée un numéro d'identification
     nommé 'id'. L'id courant sera contenu comme variable statique de cette classe.
 
+    Les messages envoyés au client ne sont pas écrits directement dans
+    le socket (non bloquant) : ils sont placés dans un tampon de sortie,
+    vidé une fois par tour de boucle synchro. Le serveur en est informé
+    par la fonction de callback cb_vidage et appelle vider_sortie en fin
+    de tour : les messages d'un même tour partent ainsi en un seul appel
+    système. Ce qui ne peut être envoyé immédiatement attend que le socket
+    soit prêt en écriture : le serveur en est informé par la fonction de
+    callback cb_ecriture. Ainsi, un client lent ne bloque pas le serveur,
+    il accumule simplement du retard. Si ce retard dépasse
+    taille_max_sortie octets, le client est déconnecté.
+
+    Si le client accepte la compression (MCCP v2, voir
+    proposer_compression), les messages envoyés passent par un compresseur
+    zlib propre au client, vidé lui aussi en fin de tour.
+
+    L'encodage du client est déterminé une fois pour toutes : soit il est
+    négocié par telnet (option CHARSET, voir proposer_encodage), soit il est
+    déduit du premier message non ASCII reçu (voir detecter_encodage).
+    Le décodeur et l'encodeur correspondants sont alors conservés.
+
     """
     id_courant = 0
+    taille_max_sortie = 1024 * 1024 # 1 Mo
 
     def __init__(self, socket_connecte, infos):
         """Constructeur standard.
@@ -70,14 +125,94 @@ class ClientConnecte:
         
         # Statut de connexion
         self.connecte = True
+
+        # Le client est-il authentifié ? Tant qu'il ne l'est pas, il peut
+        # être déconnecté par le serveur (voir delai_authentification)
+        self.authentifie = False
+
+        # Date de connexion et date de la dernière réception
+        # (time.monotonic), utilisées pour déconnecter les clients inactifs
+        self.date_connexion = time.monotonic()
+        self.derniere_activite = self.date_connexion
         
         # Message en cours (il contient la chaîne que le client
         # est en train d'écrire, dans le cas d'un client qui envoie
         # au fur et à mesure les caractères entrés)
-        self.message = b""
+        self.message = bytearray()
+
+        # Messages complets, extraits de self.message à chaque réception,
+        # en attente d'être récupérés (voir get_message)
+        self.lignes = collections.deque()
+
+        # Position à partir de laquelle chercher une fin de ligne dans
+        # self.message (ce qui précède a déjà été parcouru)
+        self.position = 0
+
+        # Caractères à ignorer au début de la prochaine réception (voir
+        # COMPLEMENTS)
+        self.complement = b""
+
+        # Nombre d'octets des messages complets en attente
+        self.taille_lignes = 0
+
+        # Contrôle du débit en réception (voir ConnexionServeur)
+        self.seau_lignes = None
+        self.seau_octets = None
+        self.lecture_suspendue = False
+
+        # Compteurs de réception
+        self.octets_recus = 0
+        self.lignes_recues = 0
+        self.octets_ignores = 0
+        self.lignes_ignorees = 0
+        self.debordements = 0
 
         # retour : il contient le message retourné en cas de déconnexion
         self.retour = ""
+
+        # Encodage du client, utilisé pour décoder les messages reçus
+        # et encoder les messages envoyés (voir changer_encodage)
+        self.encodage = None
+        self.decodeur = None
+        self.encodeur = None
+        self.changer_encodage("Utf-8")
+
+        # L'encodage est-il fixé ? Tant qu'il ne l'est pas, il peut
+        # être détecté ou négocié
+        self.encodage_fixe = False
+
+        # Analyseur du protocole telnet
+        # Les séquences telnet sont retirées des données reçues avant
+        # leur découpage en lignes (voir ajouter_message)
+        self.telnet = AnalyseurTelnet(self)
+
+        # Taille de la fenêtre du client, s'il la communique (option NAWS)
+        self.largeur = 80
+        self.hauteur = 24
+        self.telnet.accepter(NAWS, sous_negociation=self.recevoir_naws)
+
+        # Tampon de sortie, contenant les messages en attente d'envoi
+        self.tampon_sortie = collections.deque()
+        self.taille_sortie = 0 # nombre d'octets en attente
+
+        # Fonction de callback appelée quand le tampon de sortie n'a pu être
+        # entièrement vidé (le socket n'accepte plus de données)
+        self.cb_ecriture = Fonction(None)
+
+        # Fonction de callback appelée quand la sortie (tampon et
+        # compresseur) devra être vidée en fin de tour de boucle
+        # Si elle n'est pas définie, les messages sont envoyés immédiatement
+        self.cb_vidage = Fonction(None)
+        self.sortie_en_attente = False # la sortie doit être vidée
+
+        # Compteurs des envois, qui peuvent être partagés entre clients
+        # (voir ConnexionServeur.compteurs)
+        self.compteurs = CompteursEnvoi()
+
+        # Compression des messages envoyés (MCCP v2)
+        self.compresseur = None
+        self.octets_bruts = 0 # octets envoyés avant compression
+        self.octets_compresses = 0 # octets envoyés après compression
     
     def __str__(self):
         """On affiche l'ID du client, son ip et son port entrant"""
@@ -94,51 +229,250 @@ class ClientConnecte:
         -   compatibilité tintin++ : on supprime les caractères préfixant
             un accent, sans accent derrière
 
+        La fonction de nettoyage est définie dans
+        reseau/fonctions/nettoyage.py.
+
         """
-        # Compatibilité telnet
-        car_eff = b"\x08"
-        while message.count(car_eff) > 0:
-            pos = message.find(car_eff)
-            if pos > 0:
-                message = message[:pos-1] + message[pos+1:]
-            else:
-                message = message[pos+1:]
+        return nettoyer(message)
 
-        # Compatibilité Tintin++
-        car_eff = 195
-        n_message = b""
-        for i, car in enumerate(message):
-            if not (car == car_eff and i+1<len(message) and \
-                    bytes([message[i+1]]).isalpha()):
-                n_message += bytes([car])
+    def changer_encodage(self, encodage):
+        """Change l'encodage du client.
+        Le décodeur et l'encodeur (incrémentaux) sont créés une fois pour
+        toutes. Les caractères invalides sont remplacés plutôt que de
+        lever une exception.
 
+        Si l'encodage n'existe pas, une exception LookupError est levée.
 
-        message = n_message
-        return message
+        """
+        infos = codecs.lookup(encodage)
+        self.encodage = infos.name
+        self.decodeur = infos.incrementaldecoder("replace")
+        self.encodeur = infos.incrementalencoder("replace")
+
+    def detecter_encodage(self, message):
+        """Détecte l'encodage du client d'après un message non ASCII.
+        Si le message est de l'Utf-8 valide, on garde l'Utf-8 ; sinon,
+        on considère qu'il s'agit de Latin-1.
 
-    def decoder(self, message, decodage=0):
-        """Test de décodage.
-        Fonction récursive : tant qu'on peut décoder, on essaye.
+        L'encodage est ensuite fixé : cette détection n'a lieu qu'une
+        fois par client.
 
-        Si le décodage échoue, une exception sera levée.
         """
-        encodages = ['Utf-8', 'Latin-1']
-        try:
-            actuel = encodages[decodage]
-        except IndexError:
-            raise UnicodeError("aucun encodage n'a pu etre utilise " \
-                    "sur cette chaine")
         try:
-            n_message = message.decode(actuel)
-            return n_message
-        except UnicodeError:
-            return self.decoder(message, decodage+1)
+            message.decode("Utf-8")
+        except UnicodeDecodeError:
+            self.changer_encodage("Latin-1")
+        else:
+            self.changer_encodage("Utf-8")
+
+        self.encodage_fixe = True
+
+    def decoder(self, message):
+        """Décode le message (bytes) selon l'encodage du client.
+
+        Tant que l'encodage n'est pas fixé, les messages ASCII sont décodés
+        directement. Le premier message non ASCII sert à le détecter.
+
+        """
+        if not self.encodage_fixe:
+            if message.isascii():
+                return message.decode("ascii")
+            self.detecter_encodage(message)
+
+        return self.decodeur.decode(message, True)
+
+    def encoder(self, message):
+        """Encode le message (str) selon l'encodage du client."""
+        return self.encodeur.encode(message, True)
 
     def envoyer(self, message):
         """Envoie d'un message au socket.
         Le message est déjà encodé. Ce n'set plus un type str.
+
+        Le message est ajouté au tampon de sortie (ou confié au
+        compresseur si la compression est active). Il ne partira qu'au
+        vidage de la sortie, en fin de tour (voir vider_sortie).
+
+        """
+        if not self.connecte or not message:
+            return
+
+        self.compteurs.messages += 1
+        if self.compresseur is not None:
+            if not self.compresser(message):
+                return
+        elif not self.ajouter_sortie(message):
+            return
+
+        self.programmer_sortie()
+
+    def programmer_sortie(self):
+        """Demande le vidage de la sortie en fin de tour.
+        Si aucune fonction de callback cb_vidage n'est définie, la sortie
+        est vidée immédiatement.
+
+        """
+        if self.sortie_en_attente:
+            return
+
+        if self.cb_vidage.fonction is None:
+            self.vider_sortie()
+        else:
+            self.sortie_en_attente = True
+            self.cb_vidage.executer(self)
+
+    def ajouter_sortie(self, message):
+        """Ajoute le message au tampon de sortie, sans l'envoyer.
+        Si le tampon est saturé, le client est déconnecté et on retourne
+        False. Sinon, on retourne True.
+
+        """
+        self.tampon_sortie.append(message)
+        self.taille_sortie += len(message)
+        if self.taille_sortie > self.taille_max_sortie:
+            self.deconnecter("tampon de sortie saturé")
+            return False
+
+        return True
+
+    def proposer_compression(self):
+        """Propose au client la compression des messages envoyés
+        (IAC WILL COMPRESS2). S'il l'accepte, la compression démarre.
+
+        """
+        self.telnet.accepter(COMPRESS2, local=True,
+                negociation=self.negocier_compression)
+        self.telnet.demander(WILL, COMPRESS2)
+
+    def proposer_encodage(self):
+        """Propose au client de négocier l'encodage (IAC WILL CHARSET).
+        S'il l'accepte, on lui envoie les encodages proposés
+        (ENCODAGES_PROPOSES) et il choisit celui qu'il utilise.
+
+        """
+        self.telnet.accepter(CHARSET, local=True,
+                negociation=self.negocier_encodage,
+                sous_negociation=self.recevoir_encodage)
+        self.telnet.demander(WILL, CHARSET)
+
+    def negocier_encodage(self, client, commande):
+        """Le client accepte (DO) ou refuse (DONT) la négociation."""
+        if commande == DO:
+            donnees = b";" + ";".join(ENCODAGES_PROPOSES).encode("ascii")
+            self.telnet.envoyer_sous_nego(CHARSET,
+                    bytes((CHARSET_REQUEST, )) + donnees)
+
+    def recevoir_encodage(self, client, donnees):
+        """Sous-négociation CHARSET : le client accepte (ACCEPTED suivi
+        de l'encodage choisi) ou refuse (REJECTED) les encodages proposés.
+
+        Si le client refuse, l'encodage sera détecté.
+
+        """
+        if donnees[:1] != bytes((CHARSET_ACCEPTED, )):
+            return
+
+        try:
+            self.changer_encodage(donnees[1:].decode("ascii", "replace"))
+        except LookupError:
+            return
+
+        self.encodage_fixe = True
+
+    def negocier_compression(self, client, commande):
+        """Le client accepte (DO) ou refuse (DONT) la compression."""
+        if commande == DO and self.compresseur is None:
+            # La séquence de démarrage est la dernière envoyée sans
+            # compression
+            self.envoyer(bytes((IAC, SB, COMPRESS2, IAC, SE)))
+            self.compresseur = zlib.compressobj()
+        elif commande == DONT and self.compresseur is not None:
+            donnees = self.compresseur.flush(zlib.Z_FINISH)
+            self.compresseur = None
+            self.octets_compresses += len(donnees)
+            if self.ajouter_sortie(donnees):
+                self.programmer_sortie()
+
+    def compresser(self, message):
+        """Confie le message au compresseur.
+        Ce que le compresseur produit est ajouté au tampon de sortie,
+        mais n'est envoyé qu'au vidage de la sortie.
+
+        Retourne False si le tampon de sortie est saturé, True sinon.
+
+        """
+        self.octets_bruts += len(message)
+        donnees = self.compresseur.compress(message)
+        if donnees:
+            self.octets_compresses += len(donnees)
+            return self.ajouter_sortie(donnees)
+
+        return True
+
+    def vider_sortie(self):
+        """Vide le compresseur (Z_SYNC_FLUSH) s'il y en a un et envoie
+        le tampon de sortie. Cette méthode est appelée par le serveur une
+        fois par tour de boucle, pour les clients ayant envoyé des messages.
+
         """
-        self.socket.send(message)
+        self.sortie_en_attente = False
+        if not self.connecte:
+            return
+
+        if self.compresseur is not None:
+            donnees = self.compresseur.flush(zlib.Z_SYNC_FLUSH)
+            self.octets_compresses += len(donnees)
+            if not self.ajouter_sortie(donnees):
+                return
+
+        if self.tampon_sortie and not self.vider_tampon():
+            self.cb_ecriture.executer(self)
+
+    def vider_tampon(self):
+        """Envoie autant que possible le contenu du tampon de sortie.
+        Retourne True si le tampon a été entièrement vidé, False sinon.
+
+        On envoie plusieurs messages en un seul appel système (sendmsg)
+        si le système le permet. En cas d'envoi partiel, le reste du
+        message est conservé en tête du tampon, sans copie.
+
+        """
+        tampon = self.tampon_sortie
+        while tampon:
+            self.compteurs.appels += 1
+            try:
+                if ENVOI_GROUPE:
+                    morceaux = list(itertools.islice(tampon, NB_MAX_TAMPONS))
+                    envoye = self.socket.sendmsg(morceaux)
+                else:
+                    morceaux = [tampon[0]]
+                    envoye = self.socket.send(morceaux[0])
+            except (BlockingIOError, InterruptedError):
+                return False
+            except socket.error:
+                tampon.clear()
+                self.taille_sortie = 0
+                if self.connecte:
+                    self.deconnecter("perte de la connexion")
+                return True
+
+            self.taille_sortie -= envoye
+            self.compteurs.octets += envoye
+            complet = envoye == sum(len(m) for m in morceaux)
+            while envoye > 0:
+                taille = len(tampon[0])
+                if envoye >= taille:
+                    tampon.popleft()
+                    envoye -= taille
+                else:
+                    tampon[0] = memoryview(tampon[0])[envoye:]
+                    envoye = 0
+
+            # Si l'envoi est partiel, le socket n'accepte plus de données
+            if not complet:
+                return False
+
+        return True
 
     def recevoir(self):
         """Cette méthode se charge de réceptionner le message en attente.
@@ -148,42 +482,198 @@ class ClientConnecte:
 
         """
         try:
-            message = self.socket.recv(1024)
+            message = self.socket.recv(TAILLE_RECEPTION)
+        except (BlockingIOError, InterruptedError):
+            return
         except socket.error:
             self.deconnecter("perte de la connexion")
+            return
+
         if message == b"":
             self.deconnecter("perte de la connexion")
         else:
-            self.message += message
+            self.octets_recus += len(message)
+            self.ajouter_message(message)
+
+    def ajouter_message(self, message):
+        """Ajoute les octets réceptionnés au message en cours.
+
+        Cette méthode est séparée de recevoir pour pouvoir être appelée
+        par des clients qui ne lisent pas eux-mêmes leur socket
+        (voir reseau/connexions/client_async.py).
+
+        Les séquences telnet sont d'abord retirées par l'analyseur telnet.
+        Les messages complets sont ensuite extraits en un seul parcours et
+        placés dans self.lignes. Seule la partie du message reçue depuis la
+        dernière extraction est parcourue.
+
+        """
+        self.derniere_activite = time.monotonic()
+        message = self.telnet.analyser(message)
+        if not message:
+            return
+
+        if self.complement:
+            if message[:1] in self.complement:
+                message = message[1:]
+            self.complement = b""
+
+        self.message += message
+        self.extraire_lignes()
+
+    def extraire_lignes(self):
+        """Extrait de self.message les messages complets.
+        Chaque message extrait est ajouté à self.lignes, sans sa fin de
+        ligne. Le début de self.message est supprimé en une fois, sans
+        copie de ce qui reste.
+
+        """
+        tampon = self.message
+        debut = 0
+        fin_ligne = None
+        for fin_ligne in RE_FIN_LIGNE.finditer(tampon, self.position):
+            ligne = tampon[debut:fin_ligne.start()]
+            self.lignes.append(ligne)
+            self.taille_lignes += len(ligne)
+            self.lignes_recues += 1
+            debut = fin_ligne.end()
+
+        if debut > 0:
+            if debut == len(tampon):
+                self.complement = COMPLEMENTS.get(fin_ligne.group(), b"")
+            del tampon[:debut]
+
+        self.position = len(tampon)
+
+    def exporter(self):
+        """Retourne l'état du client sous la forme d'un dictionnaire,
+        pour le transmettre au processus reprenant les connexions lors
+        d'un redémarrage à chaud (voir ConnexionServeur.exporter).
+
+        Le compresseur ne pouvant être transmis, le flux compressé est
+        terminé : il sera recommencé par le nouveau processus. Les messages
+        en attente d'envoi sont transmis tels quels.
+
+        """
+        compression = self.compresseur is not None
+        if compression:
+            donnees = self.compresseur.flush(zlib.Z_FINISH)
+            self.octets_compresses += len(donnees)
+            self.tampon_sortie.append(donnees)
+            self.compresseur = None
+
+        return {
+            "fileno": self.socket.fileno(),
+            "id": self.id,
+            "adresse_ip": self.adresse_ip,
+            "port": self.port,
+            "authentifie": self.authentifie,
+            "message": bytes(self.message),
+            "lignes": [bytes(ligne) for ligne in self.lignes],
+            "complement": self.complement,
+            "sortie": b"".join(bytes(m) for m in self.tampon_sortie),
+            "encodage": self.encodage,
+            "encodage_fixe": self.encodage_fixe,
+            "largeur": self.largeur,
+            "hauteur": self.hauteur,
+            "telnet_acceptees": self.telnet.acceptees,
+            "telnet_actives": self.telnet.actives,
+            "compression": compression,
+            "octets_bruts": self.octets_bruts,
+            "octets_compresses": self.octets_compresses,
+        }
+
+    def reprendre(self, etat):
+        """Restaure l'état du client exporté par un autre processus
+        (voir exporter). Les options telnet négociées restent actives,
+        la compression est recommencée si elle l'était.
+
+        """
+        self.id = etat["id"]
+        self.authentifie = etat["authentifie"]
+        self.message = bytearray(etat["message"])
+        self.position = 0
+        self.lignes.extend(bytearray(ligne) for ligne in etat["lignes"])
+        self.taille_lignes = sum(len(ligne) for ligne in self.lignes)
+        self.complement = etat["complement"]
+        if etat["sortie"]:
+            self.ajouter_sortie(etat["sortie"])
+        self.changer_encodage(etat["encodage"])
+        self.encodage_fixe = etat["encodage_fixe"]
+        self.largeur = etat["largeur"]
+        self.hauteur = etat["hauteur"]
+        self.octets_bruts = etat["octets_bruts"]
+        self.octets_compresses = etat["octets_compresses"]
+
+        # Options telnet
+        self.telnet.acceptees = etat["telnet_acceptees"]
+        self.telnet.actives = etat["telnet_actives"]
+        if COMPRESS2 in self.telnet.acceptees["local"]:
+            self.telnet.accepter(COMPRESS2, local=True,
+                    negociation=self.negocier_compression)
+        if CHARSET in self.telnet.acceptees["local"]:
+            self.telnet.accepter(CHARSET, local=True,
+                    negociation=self.negocier_encodage,
+                    sous_negociation=self.recevoir_encodage)
+        if etat["compression"]:
+            self.negocier_compression(self, DO)
+
+    def recevoir_naws(self, client, donnees):
+        """Sous-négociation NAWS : le client communique la taille de sa
+        fenêtre (largeur puis hauteur, sur deux octets chacune).
+
+        """
+        if len(donnees) == 4:
+            self.largeur = donnees[0] * 256 + donnees[1]
+            self.hauteur = donnees[2] * 256 + donnees[3]
 
     def message_est_complet(self):
-        """Retourne True si le message se termine par un caractère de fin de
-        ligne, False sinon.
+        """Retourne True si un message complet (terminé par un caractère de
+        fin de ligne) est en attente, False sinon.
 
         """
-        fin_lignes = [b"\r", b"\n"]
-        est_complet = False
-        for code in fin_lignes:
-            if not est_complet:
-                est_complet = self.message.endswith(code)
-        return est_complet
+        return len(self.lignes) > 0
 
     def get_message(self):
-        """Cette méthode retourne le message complet.
-        Elle met à jour self.message en supprimant le message retourné.
-        Si plusieurs messages complets sont contenus, on ne retourne que le
-        premier.
-
-        """
-        message = self.message
-        message = message.replace(b"\r", b"\n")
-        while message.count(b"\n\n")>0:
-            message = message.replace(b"\n\n", b"\n")
-        messages = message.split(b"\n")
-        self.message = b"\n".join(messages[1:])
-        message = messages[0] # on retourne le premier message
-        message = self.nettoyer(message)
-        return message
+        """Cette méthode retourne le premier message complet en attente,
+        nettoyé. Il est retiré des messages en attente.
+        Si aucun message complet n'est en attente, on retourne b"".
+
+        """
+        if not self.lignes:
+            return b""
+
+        ligne = self.lignes.popleft()
+        self.taille_lignes -= len(ligne)
+        return self.nettoyer(ligne)
+
+    def get_messages(self):
+        """Générateur retournant, un par un, les messages complets en
+        attente. Chaque message retourné est nettoyé et retiré des messages
+        en attente.
+
+        """
+        while self.lignes:
+            yield self.get_message()
+
+    def taille_entree(self):
+        """Retourne le nombre d'octets reçus en attente de traitement
+        (message en cours et messages complets).
+
+        """
+        return len(self.message) + self.taille_lignes
+
+    def ignorer_entree(self):
+        """Ignore les octets reçus en attente de traitement (message en
+        cours et messages complets). Les compteurs sont mis à jour.
+
+        """
+        self.octets_ignores += self.taille_entree()
+        self.lignes_ignorees += len(self.lignes)
+        self.lignes.clear()
+        self.taille_lignes = 0
+        self.message.clear()
+        self.position = 0
 
     def get_message_decode(self):
         """Cette méthode travaille avec get_message et retourne le message
@@ -194,11 +684,22 @@ class ClientConnecte:
 
     def deconnecter(self, message):
         """Méthode appelée pour déconnecter un client.
-        - on ferme la connexion du socket
+        - on interrompt la connexion du socket
         - on met à jour le booléen self.connecte
         - on stock le message retourné dans self.retour
 
+        Le socket n'est pas fermé ici : c'est au serveur de le fermer,
+        après l'avoir retiré des sockets surveillés. On tente cependant
+        d'envoyer une dernière fois les messages en attente.
+
         """
-        self.socket.close()
         self.connecte = False
+        if self.compresseur is not None:
+            self.tampon_sortie.append(self.compresseur.flush(zlib.Z_FINISH))
+            self.compresseur = None
+        self.vider_tampon()
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
         self.retour = message
@@ -0,0 +1,62 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce fichier définit la classe CompteursEnvoi, détaillée plus bas."""
+
+class CompteursEnvoi:
+    """Cette classe regroupe les compteurs des envois aux clients :
+    -   messages : le nombre de messages envoyés (appels à envoyer)
+    -   appels : le nombre d'appels système d'envoi (send ou sendmsg)
+    -   octets : le nombre d'octets effectivement envoyés
+
+    Le rapport entre messages et appels mesure le regroupement des
+    envois : plusieurs messages envoyés dans un même tour de boucle ne
+    coûtent qu'un appel système.
+
+    """
+    def __init__(self, messages=0, appels=0, octets=0):
+        """Constructeur des compteurs."""
+        self.messages = messages
+        self.appels = appels
+        self.octets = octets
+
+    def __repr__(self):
+        return "<{0} messages, {1} appels, {2} octets>".format( \
+                self.messages, self.appels, self.octets)
+
+    def __sub__(self, autre):
+        """Retourne la différence entre deux relevés des compteurs."""
+        return CompteursEnvoi(self.messages - autre.messages,
+                self.appels - autre.appels, self.octets - autre.octets)
+
+    def copier(self):
+        """Retourne une copie des compteurs (un relevé)."""
+        return CompteursEnvoi(self.messages, self.appels, self.octets)
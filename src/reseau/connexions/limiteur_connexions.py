@@ -0,0 +1,83 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce fichier définit la classe LimiteurConnexions, détaillée plus bas."""
+
+from collections import OrderedDict
+
+from reseau.connexions.seau_jetons import SeauJetons
+
+class LimiteurConnexions:
+    """Cette classe limite le nombre de connexions acceptées par seconde
+    depuis une même adresse IP.
+
+    Chaque adresse se voit attribuer un seau à jetons (voir SeauJetons).
+    Les seaux sont conservés dans une table bornée : quand elle est
+    pleine, on oublie l'adresse utilisée le moins récemment. Ainsi, un
+    grand nombre d'adresses différentes ne peut faire grossir la table
+    indéfiniment.
+
+    """
+    def __init__(self, debit, rafale, taille_max=4096):
+        """Constructeur du limiteur.
+        -   debit : le nombre de connexions par seconde autorisées pour
+            une adresse (-1 si aucune limite)
+        -   rafale : le nombre de connexions qu'une adresse peut ouvrir
+            d'un coup, au-delà du débit précédent
+        -   taille_max : le nombre maximum d'adresses conservées
+
+        """
+        self.debit = debit
+        self.rafale = rafale
+        self.taille_max = taille_max
+        self.seaux = OrderedDict() # {adresse:seau}
+
+    def __len__(self):
+        return len(self.seaux)
+
+    def autoriser(self, adresse):
+        """Retourne True si une nouvelle connexion depuis l'adresse
+        peut être acceptée, False sinon.
+
+        """
+        if self.debit <= 0:
+            return True
+
+        seau = self.seaux.get(adresse)
+        if seau is None:
+            seau = SeauJetons(self.debit, self.rafale)
+            self.seaux[adresse] = seau
+            if len(self.seaux) > self.taille_max:
+                self.seaux.popitem(last=False)
+        else:
+            self.seaux.move_to_end(adresse)
+
+        return seau.consommer()
@@ -0,0 +1,117 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce fichier définit la classe RoueTemporelle, détaillée plus bas."""
+
+class RoueTemporelle:
+    """Cette classe représente une roue temporelle (hashed timing wheel).
+
+    Le temps est découpé en tics de 'resolution' secondes. La roue
+    possède 'nb_cases' cases : un objet dont l'échéance tombe au tic t
+    est placé dans la case t % nb_cases. Ajouter un objet est donc en
+    O(1) et, à chaque tic écoulé, on ne parcourt qu'une seule case.
+
+    Les objets dont l'échéance est plus lointaine qu'un tour de roue
+    restent dans leur case jusqu'au tour où leur échéance est atteinte.
+
+    Les échéances sont exprimées en secondes, dans la même unité que
+    le temps passé à avancer (time.monotonic() par exemple). Un objet
+    expire au plus 'resolution' secondes après son échéance.
+
+    Chaque objet est placé dans la roue sous la forme d'une entrée
+    [tic, objet, annulee], retournée par ajouter. Une entrée annulée
+    (voir annuler) ne référence plus son objet : elle reste dans sa case
+    et n'est retirée que lorsque la roue atteint cette case.
+
+    """
+    def __init__(self, maintenant, resolution=1, nb_cases=256):
+        """Constructeur de la roue, qui commence au temps maintenant."""
+        self.resolution = resolution
+        self.nb_cases = nb_cases
+        self.cases = [[] for i in range(nb_cases)]
+        self.tic = int(maintenant / resolution) # premier tic non écoulé
+        self.nb_objets = 0
+
+    def __len__(self):
+        return self.nb_objets
+
+    def ajouter(self, echeance, objet):
+        """Place l'objet dans la roue, à l'échéance précisée.
+        On retourne l'entrée créée, qui permet de l'annuler.
+
+        """
+        tic = max(int(echeance / self.resolution), self.tic)
+        entree = [tic, objet, False]
+        self.cases[tic % self.nb_cases].append(entree)
+        self.nb_objets += 1
+        return entree
+
+    def annuler(self, entree):
+        """Annule l'entrée précisée : son objet n'expirera pas."""
+        if not entree[2]:
+            entree[1] = None
+            entree[2] = True
+            self.nb_objets -= 1
+
+    def avancer(self, maintenant):
+        """Fait avancer la roue jusqu'au temps maintenant.
+        On retourne la liste des objets dont l'échéance est atteinte :
+        ils sont retirés de la roue.
+
+        """
+        cible = int(maintenant / self.resolution)
+        expires = []
+        if cible <= self.tic:
+            return expires
+
+        # Inutile de parcourir plus d'un tour de roue
+        if cible - self.tic > self.nb_cases:
+            self.tic = cible - self.nb_cases
+
+        while self.tic < cible:
+            indice = self.tic % self.nb_cases
+            case = self.cases[indice]
+            if case:
+                restants = []
+                for entree in case:
+                    if entree[2]:
+                        continue
+                    elif entree[0] <= self.tic:
+                        entree[2] = True
+                        expires.append(entree[1])
+                    else:
+                        restants.append(entree)
+                self.cases[indice] = restants
+
+            self.tic += 1
+
+        self.nb_objets -= len(expires)
+        return expires
@@ -0,0 +1,94 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce fichier définit la classe SeauJetons, détaillée plus bas."""
+
+import time
+
+class SeauJetons:
+    """Cette classe représente un seau à jetons, utilisé pour limiter le
+    débit d'un client (en lignes ou en octets par seconde).
+
+    Le seau contient au plus 'capacite' jetons et se remplit de 'debit'
+    jetons par seconde. Chaque ligne (ou octet) reçu consomme un jeton.
+    Quand le seau est vide, le client a dépassé son débit autorisé.
+
+    La capacité permet d'accepter de courtes rafales (un copier-coller
+    de quelques lignes par exemple) sans pénaliser le client.
+
+    Si le débit est négatif ou nul, le seau est illimité.
+
+    """
+    def __init__(self, debit, capacite):
+        """Constructeur du seau, qui est plein à sa création."""
+        self.debit = debit
+        self.capacite = capacite
+        self.jetons = capacite
+        self.date = time.monotonic() # date du dernier remplissage
+
+    def remplir(self):
+        """Ajoute les jetons gagnés depuis le dernier remplissage."""
+        maintenant = time.monotonic()
+        self.jetons = min(self.capacite, self.jetons + \
+                (maintenant - self.date) * self.debit)
+        self.date = maintenant
+
+    def consommer(self, nb=1, dette=False):
+        """Consomme nb jetons si le seau en contient assez.
+        Retourne True si les jetons ont été consommés, False sinon.
+
+        Si dette est à True, les jetons sont consommés même si le seau
+        n'en contient pas assez : le seau reste alors vide tant que la
+        dette n'est pas remboursée. C'est utile pour les octets, qui
+        sont déjà reçus quand on les compte.
+
+        """
+        if self.debit <= 0:
+            return True
+
+        if self.jetons < nb:
+            self.remplir()
+            if self.jetons < nb:
+                if dette:
+                    self.jetons -= nb
+                return False
+
+        self.jetons -= nb
+        return True
+
+    def est_vide(self):
+        """Retourne True si le seau ne contient plus de jeton entier."""
+        if self.debit <= 0:
+            return False
+
+        if self.jetons < 1:
+            self.remplir()
+        return self.jetons < 1
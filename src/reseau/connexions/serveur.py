@@ -35,8 +35,7 @@ Pour créer un serveur opérationnel, quelques instructions suffisent :
 >>> serveur = ConnexionServeur(4000) # test sur le port 4000
 >>> serveur.init() # initialisation, indispensable
 >>> while True: # le serveur ne s'arrête pas naturellement
-...     serveur.verifier_connexions()
-...     serveur.verifier_receptions()
+...     serveur.verifier() # connexions et réceptions en une seule attente
 
 Note importante: une fonction de Callback est utilisée pour définir
 des instructions à effectuer dans les cas suivants :
@@ -51,13 +50,28 @@ Par défaut, ces fonctions de callback vallent None.
 
 """
 
+import os
 import sys
+import time
 import socket
 import select
+import selectors
 
 from reseau.connexions.client_connecte import ClientConnecte
+from reseau.connexions.seau_jetons import SeauJetons
+from reseau.connexions.limiteur_connexions import LimiteurConnexions
+from reseau.connexions.roue_temporelle import RoueTemporelle
+from reseau.connexions.compteurs_envoi import CompteursEnvoi
+from reseau.fonctions.diffusion import diffuser
 from bases.fonction import *
 
+# Politiques appliquées quand un client dépasse son débit en réception
+IGNORER = "ignorer" # les données en excès sont ignorées
+RETARDER = "retarder" # les données en excès sont traitées aux tours suivants
+DECONNECTER = "deconnecter" # le client est déconnecté
+
+POLITIQUES = (IGNORER, RETARDER, DECONNECTER)
+
 class ConnexionServeur:
     """Cette classe représente le socket en écoute sur le port choisit
     dont le rôle est d'ajouter de nouveaux clients et de gérer leurs messages.
@@ -73,7 +87,14 @@ class ConnexionServeur:
     """
     
     def __init__(self, port, nb_clients_attente=5, nb_max_connectes=-1, \
-            attente_connexion=0.05, attente_reception=0.05):
+            attente_connexion=0.05, attente_reception=0.05, attente_max=0.1, \
+            compression=False, lignes_par_seconde=-1, rafale_lignes=10, \
+            octets_par_seconde=-1, rafale_octets=4096, taille_max_entree=-1, \
+            politique_debordement=RETARDER, connexions_par_ip=-1, \
+            rafale_connexions_ip=5, taille_table_ip=4096, \
+            delai_inactivite=-1, delai_authentification=-1, \
+            keepalive=False, keepalive_inactivite=60, keepalive_intervalle=10, \
+            keepalive_essais=5, delai_tcp=-1, negociation_encodage=False):
         """Créée un socket en écoute sur le port spécifié.
         - port : le port surlequel on écoute (>1024)
         - nb_clients_attente : le nombre maximum de clients en attente de
@@ -90,10 +111,58 @@ class ConnexionServeur:
           Si on souhaite un Time Out infini mettre cette variable à None.
         - attente_reception : temps indiquant pendant combien de temps
           on attend un message à réceptionner sur les clients déjà connectés.
-          Ce nombre est passé comme Time Out de select.select quand il s'agit
+          Ce nombre est passé comme Time Out au sélecteur quand il s'agit
           de surveiller les sockets connectés. Ce temps est précisé en seconde
           (0.05 s = 50 ms)
           Si on souhaite un Time Out infini mettre cette variable à None.
+        - attente_max : temps d'attente maximum de la méthode verifier,
+          qui surveille à la fois les connexions et les réceptions, si aucun
+          temps d'attente ne lui est précisé (0.1 s = 100 ms)
+        - compression : si True, on propose à chaque client connecté la
+          compression des messages envoyés (MCCP v2)
+        - lignes_par_seconde : le nombre de messages complets qu'un client
+          peut envoyer par seconde (-1 si aucune limite)
+        - rafale_lignes : le nombre de messages qu'un client peut envoyer
+          d'un coup, au-delà du débit précédent
+        - octets_par_seconde : le nombre d'octets qu'un client peut envoyer
+          par seconde (-1 si aucune limite)
+        - rafale_octets : le nombre d'octets qu'un client peut envoyer
+          d'un coup, au-delà du débit précédent
+        - taille_max_entree : le nombre maximum d'octets reçus d'un client
+          en attente de traitement (-1 si aucune limite)
+        - politique_debordement : ce qu'on fait quand un client dépasse
+          l'une de ces limites :
+          "ignorer" : les données en excès sont ignorées
+          "retarder" : on cesse de lire le client et les messages
+          en excès sont traités aux tours suivants
+          "deconnecter" : le client est déconnecté
+          A chaque débordement, la fonction de callback "debordement"
+          est appelée.
+        - connexions_par_ip : le nombre de connexions par seconde
+          acceptées depuis une même adresse IP (-1 si aucune limite)
+        - rafale_connexions_ip : le nombre de connexions qu'une même
+          adresse IP peut ouvrir d'un coup, au-delà du débit précédent
+        - taille_table_ip : le nombre maximum d'adresses IP dont on
+          retient le débit de connexion
+        - delai_inactivite : le nombre de secondes au bout duquel un
+          client qui n'envoie rien est déconnecté (-1 si jamais)
+        - delai_authentification : le nombre de secondes au bout duquel
+          un client non authentifié (voir ClientConnecte.authentifie)
+          est déconnecté (-1 si jamais)
+        - keepalive : si True, on active les keepalive TCP sur les sockets
+          clients, pour détecter les connexions mortes
+        - keepalive_inactivite : le nombre de secondes sans échange avant
+          d'envoyer le premier keepalive
+        - keepalive_intervalle : le nombre de secondes entre deux keepalive
+        - keepalive_essais : le nombre de keepalive sans réponse au bout
+          duquel la connexion est considérée comme morte
+        - delai_tcp : le nombre de secondes pendant lesquelles des données
+          envoyées peuvent rester sans acquittement avant que la connexion
+          soit considérée comme morte (option TCP_USER_TIMEOUT, -1 pour
+          garder le comportement du système)
+        - negociation_encodage : si True, on propose à chaque client
+          connecté de négocier son encodage (option telnet CHARSET).
+          Sinon, ou s'il refuse, son encodage est détecté
         
         Petite précision sur l'utilité de select.select :
             On utilise cette fonction pour surveiller un certain nombre
@@ -106,6 +175,12 @@ class ConnexionServeur:
             soin de récupérer les messages des clients retournés.
             Si à l'issue du temps d'attente aucun message n'a été réceptionné,
             la fonction s'interrompt et on peut reprendre la main.
+
+            Pour les sockets clients, on utilise un sélecteur (module
+            selectors) plutôt que select.select : chaque socket y est
+            enregistré une seule fois et on n'a pas besoin de reconstruire
+            la liste des sockets à chaque appel. Sous Linux, il s'appuie
+            sur epoll et n'est pas limité à FD_SETSIZE sockets.
         
         """
         self.port = port # port sur lequel on va écouter
@@ -113,11 +188,55 @@ class ConnexionServeur:
         self.nb_max_connectes = nb_max_connectes
         self.attente_connexion = attente_connexion
         self.attente_reception = attente_reception
+        self.attente_max = attente_max
+        self.compression = compression
+        self.lignes_par_seconde = lignes_par_seconde
+        self.rafale_lignes = rafale_lignes
+        self.octets_par_seconde = octets_par_seconde
+        self.rafale_octets = rafale_octets
+        self.taille_max_entree = taille_max_entree
+        if politique_debordement not in POLITIQUES:
+            raise ValueError("la politique {0} n'existe pas".format( \
+                    politique_debordement))
+        self.politique_debordement = politique_debordement
+        self.limiteur = LimiteurConnexions(connexions_par_ip,
+                rafale_connexions_ip, taille_table_ip)
+        self.connexions_refusees = 0
+        self.delai_inactivite = delai_inactivite
+        self.delai_authentification = delai_authentification
+        self.keepalive = keepalive
+        self.keepalive_inactivite = keepalive_inactivite
+        self.keepalive_intervalle = keepalive_intervalle
+        self.keepalive_essais = keepalive_essais
+        self.delai_tcp = delai_tcp
+        self.negociation_encodage = negociation_encodage
 
         self.clients = {} # un dictionnaire {id_client:client}
 
-        # Dictionnaire permettant, depuis un socket, de retrouver l'ID client
-        self.filenos = {} # correspondance {fileno_du_socket,id_client}
+        # Sélecteur surveillant les sockets clients
+        # Chaque socket client y est enregistré une seule fois, lors de son
+        # ajout, avec le client correspondant comme donnée associée.
+        # On s'appuie sur le mécanisme le plus efficace du système
+        # (epoll sous Linux, kqueue sous BSD...)
+        self.selecteur = selectors.DefaultSelector()
+
+        # Clients dont la sortie doit être vidée en fin de tour
+        self.a_vider = set()
+
+        # Compteurs des envois, partagés par tous les clients : depuis
+        # le lancement du serveur et pendant le dernier tour (voir
+        # fin_tour)
+        self.compteurs = CompteursEnvoi()
+        self.compteurs_tour = CompteursEnvoi()
+        self.releve = CompteursEnvoi() # relevé du début du tour
+
+        # Clients ayant dépassé leur débit, dont la lecture est suspendue
+        self.en_retard = set()
+
+        # Roue temporelle contenant les clients à examiner pour savoir
+        # s'ils sont inactifs (voir verifier_inactifs)
+        self.roue = RoueTemporelle(time.monotonic())
+        self.entrees_roue = {} # {id_client:entrée dans la roue}
 
         # Socket serveur
         self.socket  = None
@@ -128,6 +247,8 @@ class ConnexionServeur:
             "connexion":Fonction(None),
             "deconnexion":Fonction(None),
             "reception":Fonction(None),
+            "debordement":Fonction(None),
+            "refus":Fonction(None),
         }
 
     def init(self):
@@ -150,23 +271,71 @@ class ConnexionServeur:
             sys.exit(1)
 
         # On met en écoute le socket serveur
+        # Il est non bloquant : on accepte les connexions en attente
+        # jusqu'à ce qu'il n'y en ait plus (voir accepter_connexions)
         self.socket.listen(self.nb_clients_attente)
+        self.socket.setblocking(False)
+
+        # On l'enregistre dans le sélecteur, sans donnée associée
+        self.selecteur.register(self.socket, selectors.EVENT_READ)
 
     def get_client_depuis_socket(self, socket):
         """Cette méthode retourne le client connecté, en fonction du
-        socket passé en paramètre. On se base sur le fileno() du socket
-        pour retrouver l'ID du client et sur le dictionnaaire filenos
-        faisant la correspondance.
+        socket passé en paramètre. On se base sur le sélecteur, qui conserve
+        pour chaque socket enregistré le client correspondant.
 
         On retourne le client trouvé.
 
         """
         try:
-            return self.clients[self.filenos[socket.fileno()]]
-        except KeyError:
+            return self.selecteur.get_key(socket).data
+        except (KeyError, ValueError):
             raise KeyError("le socket n. {0} n'est pas un socket client" \
                     .format(socket.fileno()))
 
+    def exporter(self):
+        """Retourne l'état du serveur sous la forme d'un dictionnaire,
+        pour un redémarrage à chaud : le socket serveur et les sockets
+        clients sont transmis tels quels au nouveau processus (voir
+        reseau/fonctions/redemarrage.py), qui les reprend grâce à la
+        méthode reprendre.
+
+        Les descripteurs de ces sockets sont rendus héritables : ils
+        restent ouverts après le remplacement du processus (os.execv).
+
+        """
+        self.vider_sorties()
+        self.verifier_deconnexions()
+        os.set_inheritable(self.socket.fileno(), True)
+        clients = []
+        for client in self.clients.values():
+            os.set_inheritable(client.socket.fileno(), True)
+            clients.append(client.exporter())
+
+        return {
+            "socket": self.socket.fileno(),
+            "id_courant": ClientConnecte.id_courant,
+            "clients": clients,
+        }
+
+    def reprendre(self, etat):
+        """Reprend le socket serveur et les clients exportés par un autre
+        processus (voir exporter). Cette méthode remplace init : aucun
+        socket n'est créé ni fermé.
+
+        """
+        self.socket = socket.socket(fileno=etat["socket"])
+        os.set_inheritable(self.socket.fileno(), False)
+        self.socket.setblocking(False)
+        self.selecteur.register(self.socket, selectors.EVENT_READ)
+        for etat_client in etat["clients"]:
+            connexion = socket.socket(fileno=etat_client["fileno"])
+            os.set_inheritable(connexion.fileno(), False)
+            self.ajouter_client(connexion, (etat_client["adresse_ip"],
+                    etat_client["port"]), etat_client)
+
+        ClientConnecte.id_courant = etat["id_courant"]
+
     def get_clients_sockets(self):
         """Retourne la liste des sockets des différents clients connectés."""
         sockets = []
@@ -174,33 +343,102 @@ class ConnexionServeur:
             sockets.append(client.socket)
         return sockets
 
-    def ajouter_client(self, socket, infos):
+    def ajouter_client(self, socket, infos, etat=None):
         """Cette méthode se charge d'ajouter un client connecté au
-        dictionnaire des clients. On en profite pour remplir le dictionnaire
-        faisant la correspondance entre ID client et fileno() de socket.
+        dictionnaire des clients. On en profite pour enregistrer son socket
+        dans le sélecteur, le client étant conservé comme donnée associée.
 
         Cette méthode fait appel à la fonction de callback connexion.
 
+        Si etat est précisé, le client est repris d'un autre processus
+        lors d'un redémarrage à chaud (voir reprendre) : son état est
+        restauré et la fonction de callback n'est pas appelée.
+
         On retourne le client créé et ajouté.
 
         """
+        # Le socket client est non bloquant : les envois passent par
+        # le tampon de sortie du client
+        socket.setblocking(False)
+        self.configurer_socket(socket)
         client = ClientConnecte(socket, infos)
+        client.cb_ecriture = Fonction(self.surveiller_ecriture)
+        client.cb_vidage = Fonction(self.programmer_vidage)
+        client.compteurs = self.compteurs
+        client.seau_lignes = SeauJetons(self.lignes_par_seconde,
+                self.rafale_lignes)
+        client.seau_octets = SeauJetons(self.octets_par_seconde,
+                self.rafale_octets)
+        if etat is not None:
+            client.reprendre(etat)
+
         # On ajoute le client au dictionnaire des clients (id-client)
         self.clients[client.id] = client
 
-        # On renseigne le dictionnaire {socket.fileno():id_client}
-        self.filenos[socket.fileno()] = client.id
+        # On enregistre le socket dans le sélecteur
+        self.selecteur.register(socket, selectors.EVENT_READ, client)
+
+        # On programme la vérification de son inactivité
+        echeance = self.get_echeance_inactivite(client)
+        if echeance is not None:
+            self.entrees_roue[client.id] = self.roue.ajouter(echeance, client)
+
+        if etat is not None:
+            # Les messages en attente du client sont envoyés et traités
+            # au prochain tour
+            client.programmer_sortie()
+            if client.message_est_complet():
+                client.lecture_suspendue = True
+                self.en_retard.add(client)
+                self.mettre_a_jour_surveillance(client)
+            return client
+
+        # On propose la compression et la négociation de l'encodage
+        # si besoin
+        if self.compression:
+            client.proposer_compression()
+        if self.negociation_encodage:
+            client.proposer_encodage()
 
         # On appelle la fonction de callback "connexion"
         self.callbacks["connexion"].executer(client)
 
         return client
 
+    def configurer_socket(self, connexion):
+        """Paramètre le socket d'un client qui vient de se connecter.
+
+        On active si besoin les keepalive TCP et l'option
+        TCP_USER_TIMEOUT. Ces options ne sont pas disponibles sur tous
+        les systèmes : on n'utilise que celles qui existent.
+
+        L'algorithme de Nagle est désactivé (TCP_NODELAY) : les messages
+        étant regroupés en un seul envoi par tour, il ne ferait que
+        retarder cet envoi.
+
+        """
+        connexion.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.keepalive:
+            connexion.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            for nom, valeur in (
+                    ("TCP_KEEPIDLE", self.keepalive_inactivite),
+                    ("TCP_KEEPINTVL", self.keepalive_intervalle),
+                    ("TCP_KEEPCNT", self.keepalive_essais)):
+                if hasattr(socket, nom):
+                    connexion.setsockopt(socket.IPPROTO_TCP,
+                            getattr(socket, nom), valeur)
+
+        if self.delai_tcp >= 0 and hasattr(socket, "TCP_USER_TIMEOUT"):
+            # L'option attend un délai en millisecondes
+            connexion.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT,
+                    int(self.delai_tcp * 1000))
+
     def retirer_client(self, client):
         """Cette méthode se charge de retirer un client des clients
         connectés.
 
-        On doit mettre à jour self.clients mais aussi self.filenos.
+        On doit mettre à jour self.clients mais aussi retirer le socket
+        du sélecteur.
 
         Avant tout cependant, on appelle la fonction de callback "deconnexion".
 
@@ -211,10 +449,149 @@ class ConnexionServeur:
         # On supprime le client des clients connectés
         if client.id in self.clients.keys():
             del self.clients[client.id]
+        self.a_vider.discard(client)
+        self.en_retard.discard(client)
+
+        # On annule la vérification de son inactivité, pour que la roue
+        # ne le référence plus
+        entree = self.entrees_roue.pop(client.id, None)
+        if entree is not None:
+            self.roue.annuler(entree)
+
+        # On retire le socket du sélecteur avant de le fermer
+        # Ainsi, son fileno ne peut être réutilisé par un nouveau client
+        # tant qu'il est encore enregistré
+        try:
+            self.selecteur.unregister(client.socket)
+        except (KeyError, ValueError):
+            pass
+        client.socket.close()
+
+    def diffuser(self, message, exclure=None, filtre=None):
+        """Envoie un message à tous les clients connectés.
+        -   message : le message à envoyer (str ou bytes)
+        -   exclure : un client ou une collection de clients qui ne doivent
+            pas recevoir le message
+        -   filtre : une fonction prenant en paramètre un client et
+            retournant True si le message doit lui être envoyé
+
+        Le message n'est encodé qu'une seule fois par encodage
+        (voir reseau/fonctions/diffusion.py).
+
+        """
+        return diffuser(self.clients.values(), message, exclure, filtre)
+
+    def surveiller_ecriture(self, client):
+        """Cette méthode est appelée quand le tampon de sortie du client
+        n'a pu être entièrement vidé. On surveille alors son socket en
+        écriture : le tampon sera vidé dès que possible (voir verifier).
+
+        """
+        self.mettre_a_jour_surveillance(client)
+
+    def vider_tampon_client(self, client):
+        """Cette méthode est appelée quand le socket du client est prêt
+        en écriture. On vide son tampon de sortie et, s'il est vide,
+        on cesse de surveiller le socket en écriture.
+
+        """
+        if client.vider_tampon():
+            self.mettre_a_jour_surveillance(client)
+
+    def mettre_a_jour_surveillance(self, client):
+        """Met à jour les évènements surveillés sur le socket du client :
+        -   la lecture, sauf si elle est suspendue (voir deborder)
+        -   l'écriture, si le tampon de sortie n'est pas vide
+
+        Si aucun évènement n'est à surveiller, le socket est retiré du
+        sélecteur, le temps que la lecture reprenne.
+
+        """
+        if not client.connecte:
+            return
+
+        evenements = 0
+        if not client.lecture_suspendue:
+            evenements |= selectors.EVENT_READ
+        if client.tampon_sortie:
+            evenements |= selectors.EVENT_WRITE
+
+        try:
+            cle = self.selecteur.get_key(client.socket)
+        except KeyError:
+            if evenements:
+                self.selecteur.register(client.socket, evenements, client)
+        else:
+            if not evenements:
+                self.selecteur.unregister(client.socket)
+            elif evenements != cle.events:
+                self.selecteur.modify(client.socket, evenements, client)
+
+    def programmer_vidage(self, client):
+        """Cette méthode est appelée quand la sortie du client devra
+        être vidée en fin de tour (voir vider_sorties).
+
+        """
+        self.a_vider.add(client)
+
+    def vider_sorties(self):
+        """Cette méthode vide la sortie (tampon et compresseur) des clients
+        auxquels des messages ont été envoyés depuis le dernier appel.
+        Chaque client ne coûte ainsi qu'un appel système, quel que soit le
+        nombre de messages qu'il a reçus. Elle est appelée par la méthode
+        verifier, avant et après l'attente du sélecteur.
+
+        """
+        if self.a_vider:
+            clients = self.a_vider
+            self.a_vider = set()
+            for client in clients:
+                client.vider_sortie()
+
+    def get_echeance_inactivite(self, client):
+        """Retourne la date (time.monotonic) à laquelle le client devra
+        être examiné pour savoir s'il est inactif, ou None s'il n'a
+        pas à l'être.
 
-        # On supprime le socket des filenos enregistrés
-        if client.socket.fileno() in self.filenos.keys():
-            del self.filenos[client.socket.fileno()]
+        """
+        echeances = []
+        if self.delai_authentification >= 0 and not client.authentifie:
+            echeances.append(client.date_connexion + \
+                    self.delai_authentification)
+        if self.delai_inactivite >= 0:
+            echeances.append(client.derniere_activite + self.delai_inactivite)
+
+        return min(echeances) if echeances else None
+
+    def verifier_inactifs(self):
+        """Déconnecte les clients inactifs ou restés trop longtemps sans
+        s'authentifier.
+
+        Les clients sont placés dans une roue temporelle, à la date où
+        ils pourraient être inactifs. Quand cette date est atteinte, on
+        examine le client : s'il a été actif entre temps, on le replace
+        simplement dans la roue. Ainsi, une réception ne coûte que la mise
+        à jour de client.derniere_activite.
+
+        """
+        maintenant = time.monotonic()
+        for client in self.roue.avancer(maintenant):
+            self.entrees_roue.pop(client.id, None)
+            if not client.connecte or client.id not in self.clients:
+                continue
+
+            if self.delai_authentification >= 0 and not client.authentifie \
+                    and maintenant - client.date_connexion >= \
+                    self.delai_authentification:
+                client.deconnecter("délai d'authentification dépassé")
+            elif self.delai_inactivite >= 0 and maintenant - \
+                    client.derniere_activite >= self.delai_inactivite:
+                client.deconnecter("inactivité")
+            else:
+                echeance = self.get_echeance_inactivite(client)
+                if echeance is not None:
+                    self.entrees_roue[client.id] = self.roue.ajouter( \
+                            echeance, client)
 
     def verifier_deconnexions(self):
         """Cette méthode doit être appelée régulièrement pour retirer
@@ -223,19 +600,171 @@ class ConnexionServeur:
         """
         for client in list(self.clients.values()):
             if not client.connecte:
-                client.socket.close() # au cas où
                 self.retirer_client(client)
 
+    def accepter_connexions(self):
+        """Cette méthode accepte les connexions en attente sur le socket
+        serveur, jusqu'à ce qu'il n'y en ait plus.
+
+        Le socket serveur étant non bloquant, on vide ainsi en un seul
+        tour la file d'attente des connexions (après un redémarrage par
+        exemple).
+
+        """
+        while self.accepter_connexion():
+            pass
+
+    def accepter_connexion(self):
+        """Cette méthode accepte une connexion en attente sur le socket
+        serveur.
+
+        Elle se charge d'ajouter le client connecté à la liste
+        des clients si le nombre maximum de connecté n'est pas excédé
+        et si son adresse IP n'a pas ouvert trop de connexions récemment.
+
+        Dans le cas contraire, on envoie au client un message par défaut
+        et on le déconnecte du serveur. La fonction de callback "refus"
+        est appelée avec les informations de connexion et la raison
+        du refus.
+
+        Retourne True si une connexion a été traitée (acceptée ou
+        refusée), False s'il n'y en avait plus en attente.
+
+        """
+        # On tente d'accepter la connexion
+        try:
+            connexion, infos = self.socket.accept()
+        except (BlockingIOError, InterruptedError):
+            return False
+        except socket.error:
+            # Erreur passagère (connexion avortée, trop de fichiers
+            # ouverts...), on réessaiera au prochain tour
+            return False
+
+        # On vérifie qu'on peut ajouter un nouveau client
+        if self.nb_max_connectes >= 0 \
+                and len(self.clients) >= self.nb_max_connectes:
+            self.refuser_connexion(connexion, infos, "Ce serveur ne peut " \
+                    "accueillir de connexions supplementaires.")
+        elif not self.limiteur.autoriser(infos[0]):
+            self.refuser_connexion(connexion, infos, "Trop de connexions " \
+                    "depuis votre adresse, reessayez plus tard.")
+        else:
+            # On créée notre client
+            client = self.ajouter_client(connexion, infos)
+
+        return True
+
+    def refuser_connexion(self, connexion, infos, raison):
+        """Refuse la connexion en envoyant la raison au client."""
+        self.connexions_refusees += 1
+        try:
+            connexion.setblocking(False)
+            connexion.send((raison + "\r\n").encode())
+        except socket.error:
+            pass
+        connexion.close()
+        self.callbacks["refus"].executer(infos, raison)
+
+    def recevoir_client(self, client):
+        """Cette méthode réceptionne le message en attente du client passé
+        en paramètre et appelle la fonction de callback "reception" pour
+        chaque message complet.
+
+        """
+        octets_recus = client.octets_recus
+        client.recevoir()
+        if not client.connecte:
+            # On le retire immédiatement
+            self.retirer_client(client)
+            return
+
+        # On vérifie le débit en octets et la taille de l'entrée en attente
+        recus = client.octets_recus - octets_recus
+        if not client.seau_octets.consommer(recus, dette=True):
+            self.deborder(client, "débit en octets dépassé")
+        elif self.taille_max_entree >= 0 and \
+                client.taille_entree() > self.taille_max_entree:
+            self.deborder(client, "taille maximum de l'entrée dépassée")
+
+        self.traiter_messages(client)
+        if not client.connecte:
+            self.retirer_client(client)
+
+    def traiter_messages(self, client):
+        """Appelle la fonction de callback "reception" pour chaque message
+        complet du client, tant que son débit en lignes le permet.
+
+        """
+        # On part du principe que le message est récupéré au fur et à
+        # mesure dans les fonctions de callback. Sans quoi, cette
+        # instruction provoque une boucle infinie
+        while client.connecte and client.message_est_complet():
+            if not client.seau_lignes.consommer():
+                self.deborder(client, "débit en lignes dépassé")
+                break
+
+            # On appelle la fonction de callback "reception"
+            self.callbacks["reception"].executer(client)
+
+    def deborder(self, client, raison):
+        """Applique la politique de débordement au client ayant dépassé
+        l'une des limites en réception.
+
+        La fonction de callback "debordement" est appelée avec le client
+        et la raison du débordement.
+
+        """
+        if client.lecture_suspendue:
+            # Le client est déjà en retard, le débordement est signalé
+            return
+
+        client.debordements += 1
+        if self.politique_debordement == DECONNECTER:
+            client.deconnecter(raison)
+        elif self.politique_debordement == IGNORER:
+            client.ignorer_entree()
+        else:
+            # On cesse de lire le client : ses messages en attente seront
+            # traités aux tours suivants (voir verifier_retards)
+            client.lecture_suspendue = True
+            self.en_retard.add(client)
+            self.mettre_a_jour_surveillance(client)
+
+        self.callbacks["debordement"].executer(client, raison)
+
+    def verifier_retards(self):
+        """Traite les messages en attente des clients dont la lecture est
+        suspendue. Quand leur débit le permet à nouveau, on reprend
+        leur lecture.
+
+        """
+        for client in list(self.en_retard):
+            if client.connecte:
+                self.traiter_messages(client)
+                if client.message_est_complet() or \
+                        client.seau_octets.est_vide():
+                    continue
+
+                # Un message incomplet trop long ne pourra jamais être
+                # traité : on l'ignore
+                if self.taille_max_entree >= 0 and \
+                        client.taille_entree() > self.taille_max_entree:
+                    client.ignorer_entree()
+
+                client.lecture_suspendue = False
+                self.mettre_a_jour_surveillance(client)
+
+            self.en_retard.discard(client)
+
     def verifier_connexions(self):
         """Cette méthode vérifie si des clients ne sont pas en attente
         de connexion. Elle a un comportement bloquant pendant le temps
         attente_connexion spécifié dans le constructeur de l'objet.
 
-        Elle se charge d'ajouter les clients connectés à la liste
-        des clients si le nombre maximum de connecté n'est pas excédé.
-
-        Dans le cas contraire, on envoie au client un message par défaut
-        et on le déconnecte du serveur.
+        Note: cette méthode est conservée pour les boucles qui séparent
+        la surveillance des connexions et des réceptions. On lui préférera
+        la méthode verifier, qui surveille les deux à la fois.
 
         """
         self.verifier_deconnexions()
@@ -243,62 +772,88 @@ class ConnexionServeur:
         # Si aucune connexion ne se présente, au bout du temps indiqué
         # dans self.attente_connexion, select.select s'arrête
         # en levant une exception select.error
+        connexions = []
         try:
             connexions, none, none = select.select(
                 [self.socket], [], [], self.attente_connexion)
         except select.error:
             pass
 
-        # On parcourt la boucle des connexions en attente
-        # En toute logique, elle ne possède qu'un client puisque select.select
-        # s'interrompt dès qu'elle reçoit une demande de connexion
-        for connexion in connexions:
-            # On tente d'accepter la connexion
-            try:
-                socket, infos = connexion.accept()
-            except socket.error:
-                pass
-            else:
-                # On vérifie qu'on peut ajouter un nouveau client
-                if self.nb_max_connectes >= 0 \
-                        and len(self.clients) >= self.nb_max_connectes:
-                    # On refuse la connexion
-                    socket.send("Ce serveur ne peut accueillir de connexions " \
-                        "supplementaires.".encode())
-                    socket.close()
-                else:
-                    # On créée notre client
-                    client = self.ajouter_client(socket, infos)
+        if connexions:
+            self.accepter_connexions()
 
     def verifier_receptions(self):
         """Cette méthode vérifie si des clients ont envoyé des messages
-        à réceptionner. Elle se base sur select.select pour cela.
+        à réceptionner. Elle bloque au plus attente_reception secondes.
+
+        Elle redirige vers la méthode verifier.
+
+        """
+        self.verifier(self.attente_reception)
+
+    def verifier(self, attente=None):
+        """Cette méthode surveille, en un seul appel au sélecteur,
+        le socket serveur et les sockets clients :
+        -   les connexions en attente sont acceptées
+        -   les messages en attente sont réceptionnés
+        -   les tampons de sortie en attente sont vidés
+
+        Avant d'attendre, on traite les messages des clients dont la
+        lecture est suspendue (voir deborder) et on vide la sortie des
+        clients : les messages envoyés depuis le tour précédent partent
+        ainsi en un seul appel système (et en un seul bloc compressé).
+        Les messages envoyés en réponse aux évènements sont de même
+        envoyés en fin d'appel.
+
+        Elle bloque au plus attente secondes, ou self.attente_max
+        secondes si attente est None. L'ordonnanceur de la boucle synchro
+        (voir bases/ordonnanceur.py) lui passe le temps restant jusqu'au
+        prochain tour, et l'appelle de nouveau si elle rend la main plus
+        tôt.
 
         """
+        if attente is None:
+            attente = self.attente_max
+
+        self.verifier_retards()
+        self.verifier_inactifs()
+        self.vider_sorties()
         self.verifier_deconnexions()
-        # On attend avec select.select qu'un message soit réceptionné
-        # Si aucun message n'est à réceptionner au bout du temps indiqué
-        # dans self.attente_reception, select.select s'arrête
-        # en levant une exception select.error
-        receptions = []
+        # On attend avec le sélecteur qu'une connexion ou un message
+        # se présente. Si rien ne se présente au bout du temps indiqué,
+        # le sélecteur retourne une liste vide
+        evenements = []
         try:
-            receptions, none, none = select.select(
-                self.get_clients_sockets(), [], [], self.attente_reception)
-        except select.error:
+            evenements = self.selecteur.select(attente)
+        except (select.error, ValueError):
             pass
 
-        # On parcourt la boucle des clients possédant un message à réceptionner
-        for socket in receptions:
-            # On récupère le client correspondant
-            client = self.get_client_depuis_socket(socket)
-            client.recevoir()
-            # On part du principe que le message est récupéré au fur et à
-            # mesure dans les fonctions de callback. Sans quoi, cette
-            # instruction provoque une boucle infinie
-            while client.message_est_complet():
-                # On appelle la fonction de callback "reception"
-                self.callbacks["reception"].executer(client)
-
-        # On vérifie une dernière fois que tous les clients sont bien
-        # connectés
-        self.verifier_deconnexions()
+        # On parcourt les sockets prêts
+        for cle, masque in evenements:
+            # Le socket serveur n'a pas de donnée associée
+            # Pour les sockets clients, c'est le client correspondant
+            client = cle.data
+            if client is None:
+                self.accepter_connexions()
+                continue
+
+            if masque & selectors.EVENT_WRITE and client.connecte:
+                self.vider_tampon_client(client)
+            if masque & selectors.EVENT_READ and client.connecte:
+                self.recevoir_client(client)
+            if not client.connecte and client.id in self.clients:
+                self.retirer_client(client)
+
+        self.vider_sorties()
+
+    def fin_tour(self):
+        """Méthode à appeler une fois par tour de boucle synchro.
+        Les compteurs des envois du tour qui s'achève sont placés dans
+        self.compteurs_tour.
+
+        La méthode verifier peut être appelée plusieurs fois par tour :
+        ce relevé ne peut donc pas y être fait.
+
+        """
+        self.compteurs_tour = self.compteurs - self.releve
+        self.releve = self.compteurs.copier()
@@ -0,0 +1,205 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce fichier définit la classe AsyncConnexionServeur détaillée plus bas.
+
+C'est une alternative à la classe ConnexionServeur
+(reseau/connexions/serveur.py) qui s'appuie sur asyncio plutôt que sur
+une boucle synchro appelant le sélecteur. On y gagne la possibilité
+d'utiliser les outils d'asyncio (résolution DNS asynchrone, minuteries,
+exécuteurs...) sans bloquer la boucle du jeu.
+
+Le contrat des fonctions de callback est le même :
+
+>>> serveur = AsyncConnexionServeur(4000)
+>>> serveur.callbacks["reception"].fonction = cb_reception
+>>> serveur.callbacks["reception"].args = (serveur, importeur, log)
+>>> serveur.lancer(importeur.boucle) # ne retourne pas naturellement
+
+La fonction passée à lancer (ici Importeur.boucle) est appelée
+périodiquement par une tâche asyncio.
+
+"""
+
+import sys
+import asyncio
+import socket
+
+from reseau.connexions.client_async import ClientConnecteAsync
+from reseau.fonctions.diffusion import diffuser
+from bases.fonction import *
+
+class AsyncConnexionServeur:
+    """Cette classe représente le serveur asynchrone. Comme ConnexionServeur,
+    elle contient les clients connectés et les fonctions de callback
+    "connexion", "deconnexion" et "reception".
+
+    Chaque client connecté est un protocole asyncio
+    (voir reseau/connexions/client_async.py) qui informe le serveur des
+    évènements le concernant.
+
+    """
+    def __init__(self, port, nb_clients_attente=100, nb_max_connectes=-1):
+        """Constructeur du serveur.
+        - port : le port surlequel on écoute (>1024)
+        - nb_clients_attente : le nombre maximum de clients en attente de
+          connexion. Ce nombre est passé à la méthode listen du socket
+        - nb_max_connectes : le nombre maximum de clients connectés
+          -1 si on ne veut aucune limite au nombre de clients
+
+        """
+        self.port = port
+        self.nb_clients_attente = nb_clients_attente
+        self.nb_max_connectes = nb_max_connectes
+
+        self.clients = {} # un dictionnaire {id_client:client}
+
+        # Serveur asyncio, créé lors de l'initialisation
+        self.serveur = None
+
+        # Fonctions de callback
+        self.callbacks = {
+            # declencheur : (fonction, parametres)
+            "connexion":Fonction(None),
+            "deconnexion":Fonction(None),
+            "reception":Fonction(None),
+        }
+
+    async def init(self):
+        """Cette méthode doit être appelée depuis la boucle asyncio.
+        Elle met le serveur en écoute sur le port spécifié.
+
+        """
+        try:
+            self.serveur = await asyncio.get_running_loop().create_server(
+                    lambda: ClientConnecteAsync(self), "", self.port,
+                    backlog=self.nb_clients_attente, reuse_address=True)
+        except socket.error as erreur:
+            print("Le socket serveur n'a pu être connecté: {0}".format(erreur))
+            sys.exit(1)
+
+    def ajouter_client(self, client):
+        """Cette méthode est appelée par le client quand sa connexion est
+        établie. On l'ajoute aux clients connectés si le nombre maximum de
+        connectés n'est pas excédé. Dans le cas contraire, on lui envoie un
+        message par défaut et on le déconnecte.
+
+        Cette méthode fait appel à la fonction de callback connexion.
+
+        """
+        if self.nb_max_connectes >= 0 \
+                and len(self.clients) >= self.nb_max_connectes:
+            # On refuse la connexion
+            client.envoyer("Ce serveur ne peut accueillir de connexions " \
+                "supplementaires.".encode())
+            client.deconnecter("serveur plein")
+        else:
+            self.clients[client.id] = client
+            client.ajoute = True
+            self.callbacks["connexion"].executer(client)
+
+    def retirer_client(self, client):
+        """Cette méthode est appelée par le client quand sa connexion est
+        perdue. On appelle la fonction de callback "deconnexion" avant de
+        le retirer des clients connectés.
+
+        """
+        self.callbacks["deconnexion"].executer(client)
+        if client.id in self.clients.keys():
+            del self.clients[client.id]
+
+    def recevoir_client(self, client):
+        """Cette méthode est appelée par le client quand il a reçu des
+        données. On appelle la fonction de callback "reception" pour chaque
+        message complet.
+
+        """
+        # Comme pour ConnexionServeur, le message doit être récupéré
+        # dans la fonction de callback
+        while client.connecte and client.message_est_complet():
+            self.callbacks["reception"].executer(client)
+
+    def diffuser(self, message, exclure=None, filtre=None):
+        """Envoie un message à tous les clients connectés.
+        -   message : le message à envoyer (str ou bytes)
+        -   exclure : un client ou une collection de clients qui ne doivent
+            pas recevoir le message
+        -   filtre : une fonction prenant en paramètre un client et
+            retournant True si le message doit lui être envoyé
+
+        Le message n'est encodé qu'une seule fois par encodage
+        (voir reseau/fonctions/diffusion.py).
+
+        """
+        return diffuser(self.clients.values(), message, exclure, filtre)
+
+    async def boucle(self, fonction, periode):
+        """Tâche asyncio appelant périodiquement la fonction précisée
+        (un objet Fonction).
+
+        Les appels sont calés sur l'horloge de la boucle asyncio : un tour
+        en retard ne décale pas les suivants.
+
+        """
+        horloge = asyncio.get_running_loop()
+        prochain = horloge.time()
+        while True:
+            fonction.executer()
+            prochain += periode
+            attente = prochain - horloge.time()
+            if attente < 0:
+                # On est en retard d'au moins un tour, on ne cherche pas
+                # à rattraper les tours perdus
+                prochain = horloge.time()
+                attente = 0
+            await asyncio.sleep(attente)
+
+    async def tourner(self, fonction=None, periode=0.1):
+        """Initialise le serveur et exécute la fonction précisée toutes les
+        periode secondes, jusqu'à l'arrêt du serveur.
+
+        """
+        await self.init()
+        async with self.serveur:
+            if fonction is None:
+                await self.serveur.serve_forever()
+            else:
+                await self.boucle(Fonction(fonction), periode)
+
+    def lancer(self, fonction=None, periode=0.1):
+        """Lance la boucle asyncio. Cette méthode ne retourne pas
+        naturellement.
+
+        On peut préciser une fonction (par exemple importeur.boucle) à
+        exécuter toutes les periode secondes.
+
+        """
+        asyncio.run(self.tourner(fonction, periode))
@@ -41,23 +41,37 @@ fin_ligne = "\r\n"
 def cb_connexion(serveur, importeur, logger, client):
     """Que se passe-t-il quand client se connecte ?"""
     logger.info("Connexion du client {0}".format(client))
-    for c in serveur.clients.values():
-        if c is not client:
-            c.envoyer("$$ {0} se connecte au serveur{1}".format( \
-                    client, fin_ligne).encode())
+    serveur.diffuser("$$ {0} se connecte au serveur{1}".format( \
+            client, fin_ligne), exclure=client)
 
 def cb_deconnexion(serveur, importeur, logger, client):
     """Que se passe-t-il quand client se déconnecte ?"""
     logger.info("Déconnexion du client {0} : {1}".format(client, client.retour))
-    for c in serveur.clients.values():
-        if c is not client:
-            c.envoyer("** {0} se déconnecte du serveur{1}".format( \
-                    client, fin_ligne).encode())
+    if client.octets_bruts > 0:
+        logger.info("Compression du client {0} : {1} octets envoyés, " \
+                "{2} après compression".format(client.id, \
+                client.octets_bruts, client.octets_compresses))
+    serveur.diffuser("** {0} se déconnecte du serveur{1}".format( \
+            client, fin_ligne), exclure=client)
+
+def cb_refus(serveur, importeur, logger, infos, raison):
+    """Que se passe-t-il quand une connexion est refusée ?"""
+    logger.warning("Connexion refusée depuis {0}:{1} : {2} ({3} refus " \
+            "au total)".format(infos[0], infos[1], raison, \
+            serveur.connexions_refusees))
+
+def cb_debordement(serveur, importeur, logger, client, raison):
+    """Que se passe-t-il quand client dépasse son débit en réception ?"""
+    logger.warning("Débordement du client {0} ({1}, politique {2}) : " \
+            "{3} octets et {4} lignes reçus, {5} octets et {6} lignes " \
+            "ignorés, {7} débordements".format(client.id, raison, \
+            serveur.politique_debordement, client.octets_recus, \
+            client.lignes_recues, client.octets_ignores, \
+            client.lignes_ignorees, client.debordements))
 
 def cb_reception(serveur, importeur, logger, client):
     """Que se passe-t-il quand client envoie un message au serveur ?"""
     msg = client.get_message_decode()
     #print("J'ai réceptionné {0}".format(msg))
-    for c in serveur.clients.values():
-        c.envoyer("<{0}> {1}{2}".format(client.id, msg, fin_ligne).encode())
+    serveur.diffuser("<{0}> {1}{2}".format(client.id, msg, fin_ligne))
 
@@ -0,0 +1,81 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce fichier définit la fonction diffuser, utilisée par les serveurs pour
+envoyer un même message à plusieurs clients.
+
+"""
+
+def diffuser(clients, message, exclure=None, filtre=None):
+    """Envoie le message à chacun des clients précisés.
+    -   clients : un itérable contenant les clients destinataires
+    -   message : le message à envoyer, de type str ou bytes
+    -   exclure : un client ou une collection de clients auxquels
+        le message ne doit pas être envoyé
+    -   filtre : une fonction prenant en paramètre un client et retournant
+        True si le message doit lui être envoyé, False sinon
+
+    Si le message est de type str, il n'est encodé qu'une fois par
+    encodage utilisé par les clients (attribut encodage du client).
+    Les clients partageant un même encodage reçoivent le même objet bytes,
+    placé tel quel dans leur tampon de sortie.
+
+    On retourne le nombre de clients auxquels le message a été envoyé.
+
+    """
+    if exclure is None:
+        exclus = ()
+    elif hasattr(exclure, "envoyer"):
+        exclus = (exclure, )
+    else:
+        exclus = set(exclure)
+
+    encodes = {} # {encodage:message_encode}
+    nb = 0
+    for client in clients:
+        if not client.connecte or client in exclus:
+            continue
+        if filtre is not None and not filtre(client):
+            continue
+
+        if isinstance(message, str):
+            encodage = client.encodage
+            octets = encodes.get(encodage)
+            if octets is None:
+                octets = client.encoder(message)
+                encodes[encodage] = octets
+        else:
+            octets = message
+
+        client.envoyer(octets)
+        nb += 1
+
+    return nb
@@ -0,0 +1,78 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce fichier définit la fonction nettoyer, chargée de nettoyer les messages
+reçus des clients avant leur décodage.
+
+Elle travaille sur des octets et ne dépend pas du client : tout transport
+(serveur synchrone, serveur asynchrone...) peut l'utiliser.
+
+"""
+
+import re
+
+# Caractère d'effacement envoyé par le telnet de Windows
+CAR_EFFACEMENT = b"\x08"
+
+# Octet préfixant un accent envoyé par Tintin++
+CAR_TINTIN = b"\xc3"
+
+# Expression repérant les octets préfixant un accent suivis d'une lettre
+# sans accent (ces octets doivent être supprimés)
+RE_TINTIN = re.compile(CAR_TINTIN + b"(?=[A-Za-z])")
+
+def nettoyer(message):
+    """Nettoie le message passé en paramètre (bytes ou bytearray) et
+    retourne le message nettoyé (bytes).
+
+    Les nettoyages effectués sont :
+    -   compatibilité telnet Windows : on retire les caractères
+        d'effacement et le caractère précédant chacun d'eux
+    -   compatibilité tintin++ : on supprime les caractères préfixant
+        un accent, sans accent derrière
+
+    Chaque nettoyage se fait en un seul parcours du message. Si le message
+    ne contient aucun des caractères concernés, il est retourné tel quel.
+
+    """
+    if CAR_EFFACEMENT in message:
+        morceaux = message.split(CAR_EFFACEMENT)
+        n_message = bytearray(morceaux[0])
+        for morceau in morceaux[1:]:
+            if n_message:
+                del n_message[-1]
+            n_message += morceau
+        message = n_message
+
+    if CAR_TINTIN in message:
+        message = RE_TINTIN.sub(b"", message)
+
+    return bytes(message)
@@ -0,0 +1,112 @@
+# -*-coding:Utf-8 -*
+
+# Copyright (c) 2010 LE GOFF Vincent
+# All rights reserved.
+# 
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+# 
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+# * Neither the name of the copyright holder nor the names of its contributors
+#   may be used to endorse or promote products derived from this software
+#   without specific prior written permission.
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT
+# OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""Ce fichier définit les fonctions du redémarrage à chaud.
+
+Le redémarrage à chaud remplace le processus du MUD par un nouveau
+processus (nouvelle version du code par exemple) sans fermer aucune
+connexion :
+-   les modules sont détruits (ils enregistrent ce qui doit l'être)
+-   l'état du serveur et des clients est enregistré dans un fichier
+-   le processus est remplacé (os.execv), les sockets restant ouverts
+-   le nouveau processus, lancé avec l'option --reprise, lit le fichier
+    et reprend le socket serveur et les clients
+
+Le fichier de reprise est lu par pickle : quiconque peut le modifier peut
+faire exécuter du code au MUD. Il est donc créé sous un nom imprévisible,
+accessible au seul propriétaire du processus (voir tempfile.mkstemp),
+dans le dossier des logs plutôt que dans le dossier temporaire partagé.
+Avant de le lire, on vérifie qu'il appartient bien à l'utilisateur du
+processus et que personne d'autre ne peut y écrire.
+
+"""
+
+import os
+import sys
+import stat
+import time
+import pickle
+import tempfile
+
+def redemarrer(serveur, importeur, logger, rep=None):
+    """Redémarre à chaud le processus. Cette fonction ne retourne pas,
+    sauf si le remplacement du processus échoue (l'exception est alors
+    levée).
+
+    Le fichier de reprise est créé dans le dossier rep, par défaut
+    celui du logger.
+
+    """
+    if rep is None:
+        rep = logger.rep_complet
+
+    logger.info("Redémarrage à chaud ({0} clients connectés)".format(
+            len(serveur.clients)))
+    importeur.tout_detruire()
+    etat = serveur.exporter()
+    etat["date"] = time.time()
+    fd, chemin = tempfile.mkstemp(prefix="reprise_", suffix=".pic", dir=rep)
+    with os.fdopen(fd, "wb") as fichier:
+        pickle.dump(etat, fichier)
+
+    # On reprend la ligne de commande du processus, sans l'éventuelle
+    # option de reprise d'un précédent redémarrage
+    arguments = getattr(sys, "orig_argv", [sys.executable] + sys.argv)
+    arguments = [arg for arg in arguments if not arg.startswith("--reprise=")]
+    arguments.append("--reprise=" + chemin)
+    os.execv(sys.executable, arguments)
+
+def reprendre(serveur, logger, chemin):
+    """Reprend le serveur et les clients enregistrés par redemarrer.
+    Le fichier de reprise est supprimé. Cette fonction remplace l'appel
+    à serveur.init().
+
+    Si le fichier n'appartient pas à l'utilisateur du processus, ou si
+    d'autres utilisateurs peuvent y écrire, il n'est pas lu et
+    PermissionError est levée.
+
+    """
+    drapeaux = os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0)
+    with os.fdopen(os.open(chemin, drapeaux), "rb") as fichier:
+        infos = os.fstat(fichier.fileno())
+        if not stat.S_ISREG(infos.st_mode) or \
+                infos.st_uid != os.getuid() or \
+                infos.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise PermissionError("le fichier de reprise {0} n'est pas " \
+                    "sûr (propriétaire {1}, mode {2:o})".format(chemin, \
+                    infos.st_uid, stat.S_IMODE(infos.st_mode)))
+        donnees = fichier.read()
+    os.remove(chemin)
+    etat = pickle.loads(donnees)
+
+    serveur.reprendre(etat)
+    logger.info("Redémarrage à chaud effectué en {0:.3f} s ({1} clients " \
+            "repris)".format(time.time() - etat["date"], len(serveur.clients)))